@@ -0,0 +1,174 @@
+"""Precompiled, normalized index of the first-aid advice per symptom.
+
+The advice text lives in symptoms_precautions.txt as an `advice_map = {...}`
+literal. `AdviceIndex` parses it once into a dict keyed by normalized
+symptom names, merging (rather than silently dropping) duplicated keys, and
+adds an alias table so dataset spellings such as "Pains", "Tiredness" or
+"Anorexia" resolve to the matching advice. `lookup` is a single dict access
+after normalization.
+
+Run `python advice.py` to list duplicate keys and the dataset symptoms that
+still have no advice.
+"""
+import argparse
+import ast
+import re
+
+ADVICE_PATH = 'symptoms_precautions.txt'
+
+# Dataset spelling (normalized) -> advice key. Only synonyms and misspellings;
+# negated or "normal ..." symptoms are deliberately not mapped.
+ALIASES = {
+    'pains': 'pain',
+    'painful': 'pain',
+    'painfull': 'pain',
+    'tiredness': 'lethargy',
+    'fatigue': 'lethargy',
+    'fatique': 'lethargy',
+    'weakness': 'lethargy',
+    'listlessness': 'lethargy',
+    'dullness': 'lethargy',
+    'dull ness': 'lethargy',
+    'depression': 'lethargy',
+    'anorexia': 'loss of appetite',
+    'poor appetite': 'loss of appetite',
+    'loss of appettite': 'loss of appetite',
+    'decreased appetite': 'loss of appetite',
+    'difficulty in breathing': 'difficulty breathing',
+    'difficulty breating': 'difficulty breathing',
+    'dyspnea': 'difficulty breathing',
+    'respiratory distress': 'difficulty breathing',
+    'labored breathing': 'difficulty breathing',
+    'wheezing': 'difficulty breathing',
+    'lameness': 'limping',
+    'lameness in affected leg': 'limping',
+    'cough': 'coughing',
+    'convulsion': 'convulsions',
+    'seizure': 'seizures',
+    'seizuers': 'seizures',
+    'emaciation': 'weight loss',
+    'wasting': 'weight loss',
+    'swollen': 'swelling',
+    'facial swelling': 'swelling',
+    'facial edema': 'swelling',
+    'high temperature': 'fever',
+    'stumbling': 'loss of coordination',
+    'ataxia': 'loss of coordination',
+    'chills': 'shivering',
+    'diarrhoea': 'diarrhea',
+    'vomit': 'vomiting',
+    'insect bite': 'bites/scratches',
+}
+
+
+def normalize(name):
+    """Lower-case and collapse whitespace, so 'Weight  loss ' == 'weight loss'."""
+    return ' '.join(str(name).split()).lower()
+
+
+def parse_advice_file(path=ADVICE_PATH):
+    """(key, advice) pairs in file order, duplicates included."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Dict):
+            return [(ast.literal_eval(k), ast.literal_eval(v)) for k, v in zip(node.keys, node.values)]
+    raise ValueError(f"No advice dictionary found in {path}")
+
+
+def _merge(first, second):
+    # Keep every distinct bullet line, in order of first appearance
+    lines = first.splitlines()
+    lines += [line for line in second.splitlines() if line not in lines]
+    return '\n'.join(lines)
+
+
+class AdviceIndex:
+    """Normalized symptom -> advice text, with aliases and duplicate tracking."""
+
+    def __init__(self, pairs, aliases=ALIASES):
+        self.entries = {}
+        self.names = {}
+        self.duplicates = []
+        for key, text in pairs:
+            norm = normalize(key)
+            if norm in self.entries:
+                self.duplicates.append(key)
+                self.entries[norm] = _merge(self.entries[norm], text)
+            else:
+                self.entries[norm] = text
+                self.names[norm] = key
+        # Compound keys like 'seizures/fits' or 'lumps, bumps' are also
+        # reachable through each of their parts
+        self.aliases = {}
+        for norm in self.entries:
+            for part in re.split(r'[/,]', norm):
+                part = part.strip()
+                if part and part not in self.entries:
+                    self.aliases.setdefault(part, norm)
+        for alias, target in aliases.items():
+            target = normalize(target)
+            if target not in self.entries:
+                raise ValueError(f"Alias {alias!r} points at unknown advice key {target!r}")
+            self.aliases[normalize(alias)] = target
+
+    @classmethod
+    def from_file(cls, path=ADVICE_PATH, aliases=ALIASES):
+        return cls(parse_advice_file(path), aliases)
+
+    def resolve(self, symptom):
+        """Advice key for a symptom as entered, or None."""
+        norm = normalize(symptom)
+        if norm in self.entries:
+            return norm
+        if norm in self.aliases:
+            return self.aliases[norm]
+        # Plain plural of an existing key, e.g. 'seizure' <-> 'seizures'
+        if norm.endswith('s') and norm[:-1] in self.entries:
+            return norm[:-1]
+        return None
+
+    def lookup(self, symptom):
+        key = self.resolve(symptom)
+        return self.entries[key] if key is not None else None
+
+    def advice_for(self, symptoms):
+        """{symptom: advice} for the symptoms that have advice, in input order."""
+        result = {}
+        for sym in symptoms:
+            if sym and sym not in result:
+                advice = self.lookup(sym)
+                if advice:
+                    result[sym] = advice
+        return result
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the advice index.")
+    parser.add_argument('--advice', default=ADVICE_PATH)
+    parser.add_argument('--data', default='data.csv')
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from artifacts import SYMPTOM_COLS
+
+    index = AdviceIndex.from_file(args.advice)
+    print(f"{len(index)} advice entries, {len(index.aliases)} aliases")
+    print(f"Merged duplicate keys: {', '.join(index.duplicates) or 'none'}")
+
+    df = pd.read_csv(args.data, dtype=str, keep_default_na=False)
+    values = pd.Series(df[SYMPTOM_COLS].to_numpy().ravel())
+    values = values[values != '']
+    covered = values.map(lambda s: index.resolve(s) is not None)
+    print(f"Dataset symptom mentions with advice: {covered.sum()}/{len(values)}")
+    missing = values[~covered].map(normalize).value_counts().head(20)
+    print("Most frequent symptoms without advice:")
+    for name, count in missing.items():
+        print(f"  {count:5d}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Plain (non-Streamlit) loaders for the dataset and trained model artifacts.
+
+`app.py` wraps its loaders in Streamlit caches, which can't be used from
+scripts, so headless tools load the same files through these helpers.
+"""
+import hashlib
+import pickle
+
+# Column layout shared by data.csv, the encoder and every input path
+CAT_COLS = ['AnimalName', 'symptoms1', 'symptoms2', 'symptoms3', 'symptoms4', 'symptoms5']
+SYMPTOM_COLS = CAT_COLS[1:]
+TARGET_COL = 'Dangerous'
+
+DATA_PATH = 'data.csv'
+MODEL_PATH = 'random_forest_model.joblib'
+ENCODER_PATH = 'onehot_encoder.pkl'
+LABEL_ENCODER_PATH = 'label_encoder.pkl'
+
+
+def normalize(value):
+    """Comparison form of a name: whitespace collapsed, lower-cased."""
+    return ' '.join(value.split()).lower()
+
+
+def load_model(path=MODEL_PATH):
+    # joblib/pandas are imported on use so array-only consumers start quickly
+    from joblib import load
+    return load(path)
+
+
+def load_encoder(path=ENCODER_PATH):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_label_encoder(path=LABEL_ENCODER_PATH):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_dataset(path=DATA_PATH):
+    """Training data prepared exactly as in the notebook (ffill, drop missing labels)."""
+    import pandas as pd
+    data = pd.read_csv(path)
+    data.ffill(inplace=True)
+    data.dropna(subset=[TARGET_COL], inplace=True)
+    return data.reset_index(drop=True)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,312 @@
+"""Append-only prediction audit log with batched, non-blocking writes.
+
+Every prediction is recorded as one JSON line: the inputs, a hash of the
+encoded features, the model version, the probabilities and the timing.
+`AuditLog.log` only puts the record on a bounded in-memory queue; a writer
+thread takes up to `batch_size` records at a time (waiting at most
+`flush_interval` seconds to fill a batch), appends them to the current gzip
+segment and flushes and fsyncs once per batch, so the request path never
+touches the disk.
+
+* Backpressure: when the queue is full, `log` blocks until the writer
+  catches up (or drops the record after `put_timeout` seconds, if set);
+  both are counted in the metrics registry.
+* Segments: `audit-<UTC time>-<pid>-<seq>.jsonl.gz`, rotated after
+  `segment_bytes` of JSON or `segment_seconds`. Several processes can share a
+  directory, and a segment cut short by a crash stays readable up to its
+  last flushed batch.
+* `close()` drains the queue and closes the segment; the app and server
+  call it at exit.
+
+`read_records` replays a directory in order and `replay` re-scores the
+logged cases through batch_score.py and compares the outcomes.
+
+Usage:
+    python audit.py tail audit --n 5
+    python audit.py replay audit --output replayed.csv
+"""
+import argparse
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from artifacts import CAT_COLS
+from metrics import REGISTRY as metrics
+
+logger = logging.getLogger('animal_health.audit')
+
+AUDIT_DIR = 'audit'
+SEGMENT_PATTERN = 'audit-*.jsonl.gz'
+_STOP = object()
+
+
+def feature_hash(encoder, row):
+    """Short digest of the encoded case: the active one-hot columns."""
+    active = np.array(sorted(encoder.active_indices(row)), dtype=np.int32)
+    digest = hashlib.blake2b(active.tobytes(), digest_size=8, person=b'onehot')
+    digest.update(str(encoder.n_features).encode())
+    return digest.hexdigest()
+
+
+def make_record(row, model_version, dangerous, proba, seconds, feature_digest=None, source=None, **extra):
+    """Audit record of one prediction for the [animal, s1..s5] input row."""
+    record = {
+        'id': uuid.uuid4().hex,
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'source': source,
+        'animal': row[0],
+        'symptoms': [s or '' for s in row[1:]],
+        'feature_hash': feature_digest,
+        'model_version': model_version,
+        'dangerous': bool(dangerous),
+        'probability': {'not_dangerous': round(float(proba[0]), 6), 'dangerous': round(float(proba[1]), 6)},
+        'latency_ms': round(seconds * 1000, 3),
+    }
+    record.update(extra)
+    return record
+
+
+class AuditLog:
+    """Bounded queue of records, written in batches by a background thread."""
+
+    def __init__(self, directory=AUDIT_DIR, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 segment_bytes=64 * 1024 * 1024, segment_seconds=3600.0, put_timeout=None, fsync=True):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.put_timeout = put_timeout
+        self.fsync = fsync
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._segment = None
+        self._segment_path = None
+        self._segment_opened = 0.0
+        self._segment_written = 0
+        self._sequence = 0
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+
+    def log(self, record):
+        """Queue one record; blocks (or drops after `put_timeout`) while the queue is full."""
+        if self._closed:
+            raise RuntimeError("Audit log is closed")
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            metrics.inc('audit_backpressure_total')
+        start = time.perf_counter()
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+        except queue.Full:
+            metrics.inc('audit_dropped_total')
+            logger.error("Audit queue full for %.1fs, dropped record %s", self.put_timeout, record.get('id'))
+            return False
+        finally:
+            metrics.observe('audit_wait', time.perf_counter() - start)
+        return True
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def close(self, timeout=None):
+        """Write everything queued so far, close the segment and stop the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # ----- Writer thread -----
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            stop = batch[-1] is _STOP
+            records = batch[:-1] if stop else batch
+            if records:
+                try:
+                    with metrics.time('audit_write'):
+                        self._write(records)
+                    metrics.inc('audit_records_total', len(records))
+                except Exception:
+                    # Start a fresh segment next time rather than append to a broken one
+                    metrics.inc('audit_write_errors_total')
+                    logger.exception("Failed to write %d audit records", len(records))
+                    self._close_segment()
+            if stop:
+                self._close_segment()
+                return
+
+    def _open_segment(self):
+        self._sequence += 1
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        self._segment_path = os.path.join(
+            self.directory, f'audit-{stamp}-{os.getpid()}-{self._sequence:04d}.jsonl.gz')
+        # 'x': segments are append-only and never reopened or overwritten
+        self._segment = gzip.open(self._segment_path, 'xb')
+        self._segment_opened = time.monotonic()
+        self._segment_written = 0
+
+    def _close_segment(self):
+        if self._segment is None:
+            return
+        try:
+            self._segment.close()
+            self._sync(self._segment_path)
+        except Exception:
+            logger.exception("Failed to close audit segment %s", self._segment_path)
+        self._segment = None
+
+    def _sync(self, path):
+        if self.fsync:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _write(self, records):
+        if self._segment is not None and (
+                self._segment_written >= self.segment_bytes
+                or time.monotonic() - self._segment_opened >= self.segment_seconds):
+            self._close_segment()
+        if self._segment is None:
+            self._open_segment()
+        data = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+        self._segment.write(data)
+        # A sync flush ends the batch on a byte boundary readers can decode up to
+        self._segment.flush(zlib.Z_SYNC_FLUSH)
+        self._segment.fileobj.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileobj.fileno())
+        self._segment_written += len(data)
+
+
+def open_audit_log(directory=AUDIT_DIR, **kwargs):
+    """AuditLog that is drained and closed when the interpreter exits."""
+    audit_log = AuditLog(directory, **kwargs)
+    atexit.register(audit_log.close)
+    return audit_log
+
+
+def list_segments(directory=AUDIT_DIR):
+    # Names start with the UTC open time, so this is chronological per process
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+def read_records(directory=AUDIT_DIR):
+    """Yield every record in `directory`, segment by segment."""
+    for path in list_segments(directory):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    if line.endswith('\n'):
+                        yield json.loads(line)
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                # Still being written, or cut short by a crash: everything up
+                # to the last flushed batch has been read
+                logger.info("Audit segment %s ends early (open or truncated)", path)
+
+
+def replay(directory=AUDIT_DIR, output_path='replayed.csv', model=None, encoder=None, label_encoder=None):
+    """Re-score every logged case with batch_score.py; returns an agreement summary.
+
+    `output_path` gets the batch scorer's output plus the logged record id,
+    model version, outcome and probability for each case.
+    """
+    import pandas as pd
+    from batch_score import PROBA_COL, score_file
+    from artifacts import TARGET_COL
+
+    input_path = output_path + '.input.csv'
+    rows = 0
+    with open(input_path, 'w', encoding='utf-8', newline='') as f:
+        columns = ['RecordId', 'ModelVersion'] + CAT_COLS + ['LoggedDangerous', 'LoggedProbability']
+        pd.DataFrame(columns=columns).to_csv(f, index=False)
+        batch = []
+        for record in read_records(directory):
+            batch.append([record['id'], record.get('model_version'), record['animal'], *record['symptoms'],
+                          'Yes' if record['dangerous'] else 'No', record['probability']['dangerous']])
+            if len(batch) >= 10000:
+                pd.DataFrame(batch, columns=columns).to_csv(f, header=False, index=False)
+                rows += len(batch)
+                batch = []
+        pd.DataFrame(batch, columns=columns).to_csv(f, header=False, index=False)
+        rows += len(batch)
+    if not rows:
+        os.remove(input_path)
+        return {'records': 0}
+    try:
+        score_file(input_path, output_path, model=model, encoder=encoder, label_encoder=label_encoder)
+    finally:
+        os.remove(input_path)
+
+    summary = {'records': rows, 'by_model_version': {}}
+    for chunk in pd.read_csv(output_path, chunksize=50000, dtype={'ModelVersion': str}, keep_default_na=False):
+        agree = chunk[TARGET_COL] == chunk['LoggedDangerous']
+        drift = (chunk[PROBA_COL] - chunk['LoggedProbability']).abs()
+        for version, idx in chunk.groupby('ModelVersion').groups.items():
+            entry = summary['by_model_version'].setdefault(
+                version or 'unknown', {'records': 0, 'same_outcome': 0, 'max_probability_change': 0.0})
+            entry['records'] += len(idx)
+            entry['same_outcome'] += int(agree[idx].sum())
+            entry['max_probability_change'] = round(max(entry['max_probability_change'],
+                                                        float(drift[idx].max())), 4)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or replay the prediction audit log.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    tail = sub.add_parser('tail')
+    tail.add_argument('directory', nargs='?', default=AUDIT_DIR)
+    tail.add_argument('--n', type=int, default=10)
+    rep = sub.add_parser('replay')
+    rep.add_argument('directory', nargs='?', default=AUDIT_DIR)
+    rep.add_argument('--output', default='replayed.csv')
+    rep.add_argument('--model', help="Model to re-score with (default: the shipped one)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'tail':
+        from collections import deque
+        for record in deque(read_records(args.directory), maxlen=args.n):
+            print(json.dumps(record, ensure_ascii=False))
+        return
+
+    from artifacts import load_model
+    summary = replay(args.directory, args.output, model=load_model(args.model) if args.model else None)
+    print(json.dumps(summary, indent=2))
+    if summary['records']:
+        print(f"Re-scored cases -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
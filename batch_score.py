@@ -0,0 +1,146 @@
+"""Headless bulk scoring for intake CSV files.
+
+Reads a CSV with the `AnimalName,symptoms1..symptoms5` layout of data.csv in
+fixed-size chunks, encodes and scores each chunk with a single vectorized
+`predict_proba` call and appends the results to the output file, so memory
+stays flat regardless of the input size. The input can also be a columnar
+dataset (see columnar.py), which is scored from its integer codes.
+
+Usage:
+    python batch_score.py intake.csv scored.csv --chunksize 2000
+    python batch_score.py intake.cols scored.csv
+    python batch_score.py intake.csv scored.csv --drift-report drift.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifacts import (
+    CAT_COLS, TARGET_COL, MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH,
+    load_model, load_encoder, load_label_encoder,
+)
+from columnar import ColumnarDataset, is_columnar
+from drift import DriftMonitor
+from fast_encoder import FastEncoder
+
+PROBA_COL = 'Probability'
+# Encoded chunks are dense, so a chunk costs rows * n_features * 8 bytes
+DEFAULT_CHUNKSIZE = 2000
+
+
+def score_frame(df, model, encoder, label_encoder):
+    """Score one chunk; returns (labels, dangerous_probability) arrays.
+
+    `encoder` is a `FastEncoder` built from the fitted OneHotEncoder.
+    """
+    # Empty slots become '' exactly like the app, which the encoder ignores
+    features = df[CAT_COLS].fillna('').to_numpy()
+    encoded = encoder.transform(features)
+    proba = model.predict_proba(encoded)
+    # Derive the label from the same probabilities instead of a second predict()
+    labels = label_encoder.inverse_transform(model.classes_[np.argmax(proba, axis=1)])
+    dangerous_idx = list(model.classes_).index(label_encoder.transform(['Yes'])[0])
+    return labels, proba[:, dangerous_idx]
+
+
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    reader = pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False)
+    for chunk in reader:
+        missing = [c for c in CAT_COLS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+        # A header-only file still yields one empty chunk, which sklearn rejects
+        if len(chunk):
+            yield chunk
+
+
+def iter_columnar_chunks(path, chunksize, model, encoder, label_encoder):
+    """(frame, score) pairs for a columnar dataset, scored from its integer codes."""
+    dataset = ColumnarDataset(path)
+    if [v[:n] for v, n in zip(dataset.vocabulary, dataset.n_known)] != encoder.categories:
+        raise ValueError(f"{path} was converted against a different encoder")
+    dangerous_idx = list(model.classes_).index(label_encoder.transform(['Yes'])[0])
+    for start in range(0, len(dataset), chunksize):
+        codes = np.asarray(dataset.codes[start:start + chunksize])
+        # Sparse one-hot straight from the codes; appended categories are ignored
+        proba = model.predict_proba(dataset.to_csr(codes, known_only=True))
+        labels = label_encoder.inverse_transform(model.classes_[np.argmax(proba, axis=1)])
+        yield pd.DataFrame(dataset.decode(codes), columns=dataset.columns), (labels, proba[:, dangerous_idx])
+
+
+def score_file(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE,
+               model=None, encoder=None, label_encoder=None, monitor=None):
+    """Stream `input_path` through the model into `output_path`.
+
+    Any existing `Dangerous` column in the input is replaced by the prediction.
+    Returns the number of rows scored.
+    """
+    model = model if model is not None else load_model()
+    encoder = FastEncoder.from_sklearn(encoder if encoder is not None else load_encoder())
+    label_encoder = label_encoder if label_encoder is not None else load_label_encoder()
+
+    if monitor is not None:
+        monitor.use_encoder(encoder)
+    if is_columnar(input_path):
+        chunks = iter_columnar_chunks(input_path, chunksize, model, encoder, label_encoder)
+    else:
+        chunks = ((chunk, score_frame(chunk, model, encoder, label_encoder))
+                  for chunk in iter_chunks(input_path, chunksize))
+
+    rows = 0
+    for i, (chunk, (labels, dangerous)) in enumerate(chunks):
+        if monitor is not None:
+            monitor.observe_many(chunk[CAT_COLS].to_numpy())
+        chunk = chunk.drop(columns=[TARGET_COL, PROBA_COL], errors='ignore')
+        chunk[TARGET_COL] = labels
+        chunk[PROBA_COL] = np.round(dangerous, 4)
+        chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows += len(chunk)
+    if not rows:
+        # No cases: still write the header so downstream readers find the columns
+        if is_columnar(input_path):
+            columns = ColumnarDataset(input_path).columns
+        else:
+            columns = pd.read_csv(input_path, nrows=0).columns
+        columns = [c for c in columns if c not in (TARGET_COL, PROBA_COL)] + [TARGET_COL, PROBA_COL]
+        pd.DataFrame(columns=columns).to_csv(output_path, index=False)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score an intake CSV in bounded-size chunks.")
+    parser.add_argument('input', help="CSV with AnimalName,symptoms1..symptoms5 columns, or a columnar dataset")
+    parser.add_argument('output', help="Destination CSV (overwritten)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--encoder', default=ENCODER_PATH)
+    parser.add_argument('--label-encoder', default=LABEL_ENCODER_PATH)
+    parser.add_argument('--drift-report', metavar='PATH',
+                        help="Also write an input drift report against drift_reference.json")
+    args = parser.parse_args(argv)
+
+    monitor = DriftMonitor.from_file() if args.drift_report else None
+    start = time.perf_counter()
+    rows = score_file(
+        args.input, args.output, args.chunksize,
+        model=load_model(args.model),
+        encoder=load_encoder(args.encoder),
+        label_encoder=load_label_encoder(args.label_encoder),
+        monitor=monitor,
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} rows in {elapsed:.2f}s -> {args.output}")
+    if monitor is not None:
+        report = monitor.report()
+        with open(args.drift_report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Drift report -> {args.drift_report}")
+        for alert in report['alerts']:
+            print(f"  ALERT {alert}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""Reproducible benchmark suite for the prediction path.
+
+Measures, using data.csv and the shipped artifacts:
+
+* cold start of app.py itself, each case in a fresh interpreter so imports
+  and disk reads are included: `import app` (the manifest-based startup),
+  then load_engine, load_fast_encoder and the first prediction, each once
+  from the memory-mapped artifact and once from the joblib/pickle files;
+* the single-row path exactly as app.py originally ran it (one-row DataFrame,
+  encoder.transform, model.predict, model.predict_proba) next to the current
+  path (FastEncoder + CompiledForest);
+* batch throughput and peak traced memory per batch size.
+
+Results go to a JSON file. `--compare` checks them against a saved baseline
+and exits non-zero if any metric regressed by more than `--tolerance`.
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --compare bench.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+
+import mmap_artifacts
+from artifacts import CAT_COLS, DATA_PATH, MODEL_PATH, ENCODER_PATH
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+# Cold-start cases run app.py's own loaders in a fresh interpreter, so imports,
+# disk reads and the mmap / manifest paths are all included. Each case is
+# (setup, timed body); `app` is imported with a no-op Streamlit module, which
+# runs the script's startup without rendering or predicting anything
+COLD_START_CASES = {
+    'import_app': ('', 'import app\n'),
+    'load_engine': ('import app\n', 'app.load_engine({model!r})\n'),
+    'load_fast_encoder': ('import app\n', 'app.load_fast_encoder({encoder!r})\n'),
+    'first_prediction': (
+        'import app\n',
+        'bundle = app.load_model_registry().current\n'
+        'bundle.engine.predict_with_proba(bundle.encoder.transform_one({row!r}))\n',
+    ),
+}
+# Loaders whose cost depends on the artifact format: timed with the
+# memory-mapped artifact and with the joblib/pickle files
+ARTIFACT_CASES = ('load_engine', 'load_fast_encoder', 'first_prediction')
+_CHILD_TEMPLATE = (
+    "import contextlib, functools, sys, time, types, warnings\n"
+    "warnings.simplefilter('ignore')\n"
+    "st = types.ModuleType('streamlit')\n"
+    "st.cache_data = st.cache_resource = lambda fn: functools.lru_cache(maxsize=None)(fn)\n"
+    "st.sidebar = contextlib.nullcontext()\n"
+    "st.expander = lambda *a, **k: contextlib.nullcontext()\n"
+    "st.__getattr__ = lambda name: (lambda *a, **k: None)\n"
+    "sys.modules['streamlit'] = st\n"
+    "{setup}"
+    "_start = time.perf_counter()\n"
+    "{body}"
+    "print(time.perf_counter() - _start)\n"
+)
+
+
+def metric(value, unit, higher_is_better=False):
+    return {'value': round(float(value), 6), 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def time_cold_start(name, repeats, paths, artifact_dir):
+    setup, body = COLD_START_CASES[name]
+    script = _CHILD_TEMPLATE.format(setup=setup, body=body.format(**paths))
+    # No audit segments or metrics port from the benchmark's app instances
+    env = dict(os.environ, MODEL_ARTIFACT_DIR=artifact_dir, AUDIT_DIR='')
+    env.pop('METRICS_PORT', None)
+    timings = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def time_calls(fn, cases, repeats):
+    """Median and p99 seconds of fn(case) over `repeats` calls."""
+    timings = []
+    for i in range(repeats):
+        case = cases[i % len(cases)]
+        start = time.perf_counter()
+        fn(case)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings)
+    return float(np.median(timings)), float(np.percentile(timings, 99))
+
+
+def run(data_path=DATA_PATH, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+        repeats=200, cold_repeats=3, batch_repeats=5, batch_sizes=BATCH_SIZES, artifact_dir=None):
+    """Run every benchmark; `artifact_dir` is the memory-mapped artifact to load
+    (default: the app's, or one converted from `model_path` into a temp dir)."""
+    import pandas as pd
+    from artifacts import load_model, load_encoder
+    from fast_encoder import FastEncoder
+    from forest_engine import CompiledForest
+
+    warnings.simplefilter('ignore')
+    metrics = {}
+
+    df = pd.read_csv(data_path, dtype=str, keep_default_na=False)
+    rows = df[CAT_COLS].to_numpy().tolist()
+
+    paths = {'model': os.path.abspath(model_path), 'encoder': os.path.abspath(encoder_path), 'row': rows[0]}
+    with tempfile.TemporaryDirectory() as tmp:
+        if artifact_dir is None:
+            artifact_dir = os.path.join(ROOT, mmap_artifacts.ARTIFACT_DIR)
+            if not os.path.isdir(artifact_dir):
+                artifact_dir = os.path.join(tmp, 'model.forest')
+                mmap_artifacts.convert(model_path, encoder_path, output_dir=artifact_dir)
+        formats = {'mmap': os.path.abspath(artifact_dir), 'joblib': os.path.join(tmp, 'missing.forest')}
+        for name in COLD_START_CASES:
+            if name not in ARTIFACT_CASES:
+                seconds = time_cold_start(name, cold_repeats, paths, formats['mmap'])
+                metrics[f'cold_start.{name}_ms'] = metric(seconds * 1000, 'ms')
+                continue
+            for fmt, directory in formats.items():
+                seconds = time_cold_start(name, cold_repeats, paths, directory)
+                metrics[f'cold_start.{name}_{fmt}_ms'] = metric(seconds * 1000, 'ms')
+
+    model = load_model(model_path)
+    encoder = load_encoder(encoder_path)
+    fast_encoder = FastEncoder.from_sklearn(encoder)
+    engine = CompiledForest.from_sklearn(model)
+
+    def app_path(row):
+        # The original app.py request path
+        input_df = pd.DataFrame([row], columns=CAT_COLS)
+        encoded = encoder.transform(input_df)
+        model.predict(encoded)[0]
+        model.predict_proba(encoded)[0]
+
+    def fast_path(row):
+        engine.predict_with_proba(fast_encoder.transform_one(row))
+
+    for name, fn in (('app', app_path), ('fast', fast_path)):
+        p50, p99 = time_calls(fn, rows, repeats)
+        metrics[f'single_row.{name}_p50_ms'] = metric(p50 * 1000, 'ms')
+        metrics[f'single_row.{name}_p99_ms'] = metric(p99 * 1000, 'ms')
+
+    for size in batch_sizes:
+        batch = [rows[i % len(rows)] for i in range(size)]
+        for name, score in (
+            ('sklearn', lambda b: model.predict_proba(encoder.transform(pd.DataFrame(b, columns=CAT_COLS)))),
+            ('fast', lambda b: engine.predict_with_proba(fast_encoder.transform(b))),
+        ):
+            # Throughput from untraced runs; tracing slows allocation-heavy code
+            timings = []
+            for _ in range(batch_repeats):
+                start = time.perf_counter()
+                score(batch)
+                timings.append(time.perf_counter() - start)
+            tracemalloc.start()
+            score(batch)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            metrics[f'batch_{size}.{name}_rows_per_s'] = metric(
+                size / statistics.median(timings), 'rows/s', higher_is_better=True)
+            metrics[f'batch_{size}.{name}_peak_mb'] = metric(peak / 2**20, 'MB')
+
+    return {
+        'meta': {
+            'created_utc': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'repeats': repeats,
+            'rows': len(rows),
+        },
+        'metrics': metrics,
+    }
+
+
+def compare(current, baseline, tolerance=0.2):
+    """List of (name, baseline, current, change) for metrics worse than tolerance."""
+    regressions = []
+    for name, cur in current['metrics'].items():
+        base = baseline['metrics'].get(name)
+        if base is None or base['value'] == 0:
+            continue
+        change = (cur['value'] - base['value']) / base['value']
+        worse = -change if cur['higher_is_better'] else change
+        if worse > tolerance:
+            regressions.append((name, base['value'], cur['value'], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction path.")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--encoder', default=ENCODER_PATH)
+    parser.add_argument('--artifact-dir', help="Memory-mapped artifact for the cold-start cases "
+                                               "(default: the app's, else converted from --model)")
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--cold-repeats', type=int, default=3)
+    parser.add_argument('--batch-repeats', type=int, default=5)
+    parser.add_argument('--compare', metavar='BASELINE', help="Saved results to check against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed relative slowdown before a metric counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.data, args.model, args.encoder, args.repeats, args.cold_repeats, args.batch_repeats,
+                  artifact_dir=args.artifact_dir)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    for name, m in results['metrics'].items():
+        print(f"{name:40s} {m['value']:>14.3f} {m['unit']}")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for name, base, cur, change in regressions:
+                print(f"  {name}: {base:.3f} -> {cur:.3f} ({change:+.1%})")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
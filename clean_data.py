@@ -0,0 +1,226 @@
+"""Reproducible cleaning stage: data.csv -> cleaned_data.csv + cleaning report.
+
+The notebook only forward-fills missing values, which copies a value from the
+previous animal's row. This stage streams the raw export in fixed-size chunks,
+twice, so memory depends on the vocabulary and the number of distinct cases,
+not on the file size:
+
+Pass 1 counts the spellings of every animal / symptom / label (compared after
+collapsing whitespace and lower-casing) and the labels seen for every case.
+
+Pass 2 writes each row with
+* names rewritten to their most common spelling (whitespace trimmed);
+* missing symptom slots left explicitly empty, never filled from other rows;
+  rows without an animal, a label or `--min-symptoms` symptoms are dropped;
+* duplicates dropped by hashing the normalized case: the animal plus the
+  positional symptoms ("exact") or the symptom multiset ("reordered");
+* cases whose identical (reordered) copies carry both labels dropped, or, with
+  `--conflicts first`, kept with the first label seen.
+
+Readers should use `keep_default_na=False` so empty slots stay ''.
+
+Usage:
+    python clean_data.py                                  # data.csv -> cleaned_data.csv
+    python clean_data.py export.csv cleaned.csv --chunksize 100000 --dedupe exact
+"""
+import argparse
+import csv
+import hashlib
+import json
+import time
+from collections import Counter
+
+import pandas as pd
+
+from artifacts import CAT_COLS, SYMPTOM_COLS, TARGET_COL, DATA_PATH, normalize
+
+CLEANED_PATH = 'cleaned_data.csv'
+REPORT_PATH = 'cleaning_report.json'
+DEFAULT_CHUNKSIZE = 50000
+LABELS = ('No', 'Yes')
+EXAMPLES = 20
+
+
+def case_hash(animal, symptoms, ordered):
+    """8-byte digest of a normalized case; `ordered=False` ignores slot order."""
+    parts = [animal] + (list(symptoms) if ordered else sorted(s for s in symptoms if s))
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).digest()
+
+
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    reader = pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False)
+    for chunk in reader:
+        missing = [c for c in CAT_COLS + [TARGET_COL] if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+        yield chunk[CAT_COLS + [TARGET_COL]].to_numpy()
+
+
+class Cleaner:
+    """Two-pass cleaner; `scan` every chunk, then `clean` every chunk."""
+
+    def __init__(self, min_symptoms=3, dedupe='reordered', conflicts='drop'):
+        if dedupe not in ('exact', 'reordered', 'none'):
+            raise ValueError(f"Unknown dedupe mode: {dedupe}")
+        if conflicts not in ('drop', 'first'):
+            raise ValueError(f"Unknown conflicts mode: {conflicts}")
+        self.min_symptoms = min_symptoms
+        self.dedupe = dedupe
+        self.conflicts = conflicts
+        self.raw_counts = Counter()
+        self.spellings = {}       # normalized name -> Counter of trimmed spellings
+        self.case_labels = {}     # unordered case hash -> set of labels
+        self.canonical = {}
+        self.seen_exact = set()
+        self.seen_unordered = set()
+        self.seen_conflicts = set()
+        self.stats = Counter()
+        self.missing_slots = Counter()
+        self.conflict_examples = []
+        # Raw value -> normalized key; bounded by the number of distinct spellings
+        self._keys = {}
+
+    def _key(self, value):
+        key = self._keys.get(value)
+        if key is None:
+            key = self._keys[value] = normalize(value)
+        return key
+
+    def scan(self, rows):
+        for row in rows:
+            self.raw_counts.update(row)
+            keys = [self._key(v) for v in row]
+            animal, symptoms, label = keys[0], keys[1:-1], keys[-1]
+            if animal and label:
+                self.case_labels.setdefault(case_hash(animal, symptoms, False), set()).add(label)
+
+    def _finish_scan(self):
+        for raw, n in self.raw_counts.items():
+            key = self._key(raw)
+            if key:
+                self.spellings.setdefault(key, Counter())[' '.join(raw.split())] += n
+        # Most common spelling wins; Counter keeps first-seen order on ties
+        self.canonical = {key: counts.most_common(1)[0][0] for key, counts in self.spellings.items()}
+        self.canonical.update({label.lower(): label for label in LABELS})
+
+    def clean(self, rows):
+        """Cleaned rows of one chunk, as lists of strings."""
+        if not self.canonical:
+            self._finish_scan()
+        out = []
+        for row in rows:
+            self.stats['rows_in'] += 1
+            keys = [self._key(v) for v in row]
+            animal, symptoms, label = keys[0], keys[1:-1], keys[-1]
+            for raw, key in zip(row, keys):
+                if key and raw != self.canonical[key]:
+                    self.stats['values_respelled'] += 1
+            for col, key in zip(SYMPTOM_COLS, symptoms):
+                if not key:
+                    self.missing_slots[col] += 1
+
+            if not animal:
+                self.stats['dropped_missing_animal'] += 1
+                continue
+            if label not in ('no', 'yes'):
+                self.stats['dropped_missing_label' if not label else 'dropped_unknown_label'] += 1
+                continue
+            if sum(1 for s in symptoms if s) < self.min_symptoms:
+                self.stats['dropped_too_few_symptoms'] += 1
+                continue
+
+            unordered = case_hash(animal, symptoms, False)
+            if len(self.case_labels[unordered]) > 1:
+                if unordered not in self.seen_conflicts:
+                    self.seen_conflicts.add(unordered)
+                    if len(self.conflict_examples) < EXAMPLES:
+                        self.conflict_examples.append([' '.join(v.split()) for v in row[:-1]])
+                if self.conflicts == 'drop':
+                    self.stats['dropped_conflicting_label'] += 1
+                    continue
+
+            if self.dedupe != 'none':
+                exact = case_hash(animal, symptoms, True)
+                if exact in self.seen_exact:
+                    self.stats['dropped_exact_duplicate'] += 1
+                    continue
+                if self.dedupe == 'reordered' and unordered in self.seen_unordered:
+                    self.stats['dropped_reordered_duplicate'] += 1
+                    continue
+                self.seen_exact.add(exact)
+                self.seen_unordered.add(unordered)
+
+            out.append([self.canonical[k] if k else '' for k in keys])
+            self.stats['rows_out'] += 1
+        return out
+
+    def report(self):
+        variants = {
+            self.canonical[key]: sorted(counts) for key, counts in self.spellings.items() if len(counts) > 1
+        }
+        return {
+            'settings': {'min_symptoms': self.min_symptoms, 'dedupe': self.dedupe, 'conflicts': self.conflicts},
+            'counts': dict(sorted(self.stats.items())),
+            'missing_slots': {col: self.missing_slots[col] for col in SYMPTOM_COLS},
+            'distinct_cases': len(self.case_labels),
+            'conflicting_cases': sum(1 for labels in self.case_labels.values() if len(labels) > 1),
+            'spelling_variants_merged': len(variants),
+            'spelling_variants': dict(sorted(variants.items())[:100]),
+            'conflict_examples': self.conflict_examples,
+        }
+
+
+def clean_file(input_path=DATA_PATH, output_path=CLEANED_PATH, report_path=REPORT_PATH,
+               chunksize=DEFAULT_CHUNKSIZE, min_symptoms=3, dedupe='reordered', conflicts='drop'):
+    start = time.perf_counter()
+    cleaner = Cleaner(min_symptoms, dedupe, conflicts)
+    for rows in iter_chunks(input_path, chunksize):
+        cleaner.scan(rows)
+    scanned = time.perf_counter()
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(CAT_COLS + [TARGET_COL])
+        for rows in iter_chunks(input_path, chunksize):
+            writer.writerows(cleaner.clean(rows))
+    elapsed = time.perf_counter() - start
+
+    report = cleaner.report()
+    report['input'] = input_path
+    report['output'] = output_path
+    report['timing'] = {
+        'scan_seconds': round(scanned - start, 3),
+        'total_seconds': round(elapsed, 3),
+        'rows_per_s': round(cleaner.stats['rows_in'] / elapsed) if elapsed else None,
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean a raw export into cleaned_data.csv.")
+    parser.add_argument('input', nargs='?', default=DATA_PATH)
+    parser.add_argument('output', nargs='?', default=CLEANED_PATH)
+    parser.add_argument('--report', default=REPORT_PATH)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--min-symptoms', type=int, default=3)
+    parser.add_argument('--dedupe', choices=('reordered', 'exact', 'none'), default='reordered',
+                        help="reordered: same animal and symptom set; exact: same slots")
+    parser.add_argument('--conflicts', choices=('drop', 'first'), default='drop',
+                        help="Cases seen with both labels: drop them all or keep the first")
+    args = parser.parse_args(argv)
+
+    report = clean_file(args.input, args.output, args.report, args.chunksize,
+                        args.min_symptoms, args.dedupe, args.conflicts)
+    counts = report['counts']
+    print(f"{counts.get('rows_in', 0)} rows -> {counts.get('rows_out', 0)} rows "
+          f"in {report['timing']['total_seconds']}s; wrote {args.output} and {args.report}")
+    for name, n in counts.items():
+        if name.startswith('dropped_'):
+            print(f"  {name[len('dropped_'):]}: {n}")
+    print(f"  conflicting cases: {report['conflicting_cases']}, "
+          f"spelling variants merged: {report['spelling_variants_merged']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""Dictionary-encoded columnar dataset format.
+
+data.csv is six low-cardinality string columns plus the Yes/No label, and
+every consumer used to re-parse it and re-derive the categories. This format
+stores each column as integer codes into a per-column vocabulary that starts
+with the fitted encoder's categories, in encoder order, so code `j` of column
+`c` is one-hot column `offsets[c] + j` of that encoder. Values the encoder
+does not know are appended after its categories (`n_known` records where the
+encoder's part ends).
+
+Layout of `data.cols/`:
+
+    meta.json        format version, row count, dtypes, vocabularies, n_known,
+                     label classes, source checksum
+    codes.bin        (rows, 6) codes, row-major; -1 marks an empty slot
+    labels.bin       (rows,) index into the label classes; -1 marks a missing label
+
+Both binary files are raw arrays opened with `np.memmap`, written
+chunk by chunk, so converting and reading are streaming and the readers get
+integer codes without any string parsing. `ColumnarDataset` builds the
+sparse one-hot matrix for sklearn straight from the codes.
+
+Usage:
+    python columnar.py convert                        # data.csv -> data.cols
+    python columnar.py convert intake.csv --output intake.cols
+    python columnar.py info data.cols
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from artifacts import CAT_COLS, TARGET_COL, DATA_PATH, ENCODER_PATH, LABEL_ENCODER_PATH, file_sha256
+
+COLUMNAR_PATH = 'data.cols'
+META_FILE = 'meta.json'
+CODES_FILE = 'codes.bin'
+LABELS_FILE = 'labels.bin'
+FORMAT_VERSION = 1
+DEFAULT_CHUNKSIZE = 100000
+
+
+def is_columnar(path):
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def _code_dtype(n_categories):
+    return np.int16 if n_categories < np.iinfo(np.int16).max else np.int32
+
+
+def convert(csv_path=DATA_PATH, output_dir=COLUMNAR_PATH, encoder=None, label_classes=None,
+            chunksize=DEFAULT_CHUNKSIZE):
+    """Stream `csv_path` into the columnar layout; returns the meta dict.
+
+    `encoder` is the fitted OneHotEncoder whose categories the codes align with
+    (default: the shipped one); `label_classes` the LabelEncoder classes.
+    """
+    import pandas as pd
+    from artifacts import load_encoder, load_label_encoder
+
+    encoder = encoder if encoder is not None else load_encoder(ENCODER_PATH)
+    if label_classes is None:
+        label_classes = load_label_encoder(LABEL_ENCODER_PATH).classes_
+    vocab = [list(c) for c in encoder.categories_]
+    lookups = [{v: i for i, v in enumerate(values)} for values in vocab]
+    indexes = [pd.Index(values) for values in vocab]
+    n_known = [len(values) for values in vocab]
+    label_codes = {str(c): i for i, c in enumerate(label_classes)}
+
+    os.makedirs(output_dir, exist_ok=True)
+    rows, has_labels = 0, None
+    # int32 while streaming: the final vocabulary size is only known at the end
+    with open(os.path.join(output_dir, CODES_FILE + '.tmp'), 'wb') as codes_out, \
+            open(os.path.join(output_dir, LABELS_FILE), 'wb') as labels_out:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str, keep_default_na=False):
+            missing = [c for c in CAT_COLS if c not in chunk.columns]
+            if missing:
+                raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+            codes = np.empty((len(chunk), len(CAT_COLS)), dtype=np.int32)
+            for j, col in enumerate(CAT_COLS):
+                if len(indexes[j]) != len(vocab[j]):
+                    indexes[j] = pd.Index(vocab[j])
+                column = chunk[col].to_numpy()
+                codes[:, j] = indexes[j].get_indexer(column)
+                # Only values missing from the vocabulary go through Python
+                for i in np.flatnonzero(codes[:, j] < 0):
+                    value = column[i]
+                    if value == '':
+                        continue
+                    code = lookups[j].get(value)
+                    if code is None:
+                        code = lookups[j][value] = len(vocab[j])
+                        vocab[j].append(value)
+                    codes[i, j] = code
+            codes_out.write(codes.tobytes())
+
+            has_labels = TARGET_COL in chunk.columns if has_labels is None else has_labels
+            if has_labels:
+                unknown = set(chunk[TARGET_COL]) - set(label_codes) - {''}
+                if unknown:
+                    raise ValueError(f"Unknown labels: {', '.join(sorted(unknown))}")
+                labels = np.array([label_codes.get(v, -1) for v in chunk[TARGET_COL]], dtype=np.int8)
+                labels_out.write(labels.tobytes())
+            rows += len(chunk)
+
+    code_dtype = _code_dtype(max(len(v) for v in vocab))
+    tmp_path = os.path.join(output_dir, CODES_FILE + '.tmp')
+    wide = np.memmap(tmp_path, dtype=np.int32, mode='r', shape=(rows, len(CAT_COLS))) if rows else None
+    with open(os.path.join(output_dir, CODES_FILE), 'wb') as f:
+        for start in range(0, rows, chunksize):
+            f.write(np.asarray(wide[start:start + chunksize], dtype=code_dtype).tobytes())
+    del wide
+    os.remove(tmp_path)
+    if not has_labels:
+        os.remove(os.path.join(output_dir, LABELS_FILE))
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'rows': rows,
+        'columns': list(CAT_COLS),
+        'code_dtype': np.dtype(code_dtype).name,
+        'vocabulary': vocab,
+        'n_known': n_known,
+        'label_classes': [str(c) for c in label_classes] if has_labels else None,
+        'source': {'path': csv_path, 'sha256': file_sha256(csv_path)},
+    }
+    with open(os.path.join(output_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
+
+
+def forward_fill(codes):
+    """Replace -1 by the last earlier value in the same column (pandas ffill)."""
+    codes = np.asarray(codes)
+    squeeze = codes.ndim == 1
+    codes = codes.reshape(len(codes), -1)
+    index = np.where(codes >= 0, np.arange(len(codes))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = np.take_along_axis(codes, index, axis=0)
+    return filled[:, 0] if squeeze else filled
+
+
+class ColumnarDataset:
+    """Read side of the format; arrays are memory-mapped, read-only."""
+
+    def __init__(self, path=COLUMNAR_PATH):
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version: {meta.get('format_version')}")
+        self.path = path
+        self.meta = meta
+        self.rows = meta['rows']
+        self.columns = meta['columns']
+        self.vocabulary = meta['vocabulary']
+        self.n_known = meta['n_known']
+        self.label_classes = meta['label_classes']
+        shape = (self.rows, len(self.columns))
+        self.codes = np.memmap(os.path.join(path, CODES_FILE), dtype=meta['code_dtype'], mode='r',
+                               shape=shape) if self.rows else np.empty(shape, dtype=meta['code_dtype'])
+        self.labels = None
+        if self.label_classes is not None:
+            self.labels = np.memmap(os.path.join(path, LABELS_FILE), dtype=np.int8, mode='r',
+                                    shape=(self.rows,)) if self.rows else np.empty(0, dtype=np.int8)
+
+    def __len__(self):
+        return self.rows
+
+    def sizes(self, known_only=False):
+        return self.n_known if known_only else [len(v) for v in self.vocabulary]
+
+    def to_csr(self, codes=None, known_only=False, dtype=np.float64):
+        """Sparse one-hot matrix of `codes` (default: all rows).
+
+        With `known_only`, columns follow the encoder the data was converted
+        against and appended categories activate nothing, exactly like
+        `handle_unknown='ignore'`.
+        """
+        from scipy import sparse
+        codes = self.codes if codes is None else codes
+        sizes = self.sizes(known_only)
+        offsets = np.cumsum([0] + sizes[:-1])
+        valid = (codes >= 0) & (codes < np.asarray(sizes))
+        indices = (codes.astype(np.int64) + offsets)[valid]
+        indptr = np.concatenate([[0], np.cumsum(valid.sum(axis=1))])
+        data = np.ones(len(indices), dtype=dtype)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(codes), int(sum(sizes))))
+
+    def decode(self, codes=None):
+        """Object array of the original strings ('' for empty slots)."""
+        codes = self.codes if codes is None else codes
+        out = np.empty(codes.shape, dtype=object)
+        for j, values in enumerate(self.vocabulary):
+            lookup = np.array(values + [''], dtype=object)
+            out[:, j] = lookup[codes[:, j]]
+        return out
+
+    def feature_names(self, known_only=False):
+        return [f'{col}_{value}' for col, values, n in zip(self.columns, self.vocabulary, self.sizes(known_only))
+                for value in values[:n]]
+
+    def training_set(self):
+        """(X csr, y, row index) with load_dataset's semantics: ffill, drop unlabeled rows."""
+        if self.labels is None:
+            raise ValueError(f"{self.path} has no {TARGET_COL} column")
+        codes = forward_fill(self.codes)
+        labels = forward_fill(self.labels)
+        keep = np.flatnonzero(labels >= 0)
+        return self.to_csr(codes[keep]), np.asarray(labels[keep], dtype=np.intp), keep
+
+    def encoders(self):
+        """OneHotEncoder / LabelEncoder equivalent to this vocabulary."""
+        import pandas as pd
+        from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+        encoder = OneHotEncoder(categories=[list(v) for v in self.vocabulary],
+                                sparse_output=False, handle_unknown='ignore')
+        encoder.fit(pd.DataFrame([[v[0] for v in self.vocabulary]], columns=self.columns))
+        label_encoder = LabelEncoder()
+        label_encoder.classes_ = np.array(self.label_classes, dtype=object)
+        return encoder, label_encoder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert CSV data to the columnar format.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    conv = sub.add_parser('convert')
+    conv.add_argument('input', nargs='?', default=DATA_PATH)
+    conv.add_argument('--output', default=COLUMNAR_PATH)
+    conv.add_argument('--encoder', default=ENCODER_PATH, help="Encoder the codes are aligned with")
+    conv.add_argument('--label-encoder', default=LABEL_ENCODER_PATH)
+    conv.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    info = sub.add_parser('info')
+    info.add_argument('path', nargs='?', default=COLUMNAR_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        from artifacts import load_encoder, load_label_encoder
+        meta = convert(args.input, args.output, load_encoder(args.encoder),
+                       load_label_encoder(args.label_encoder).classes_, args.chunksize)
+        size = sum(os.path.getsize(os.path.join(args.output, f)) for f in os.listdir(args.output))
+        print(f"Wrote {args.output}: {meta['rows']} rows, {size} bytes "
+              f"(source {os.path.getsize(args.input)} bytes)")
+        return
+
+    ds = ColumnarDataset(args.path)
+    print(f"{args.path}: {len(ds)} rows, codes {ds.meta['code_dtype']}, "
+          f"labels {'yes' if ds.labels is not None else 'no'}")
+    for col, values, n in zip(ds.columns, ds.vocabulary, ds.n_known):
+        print(f"  {col:12s} {len(values):5d} categories ({len(values) - n} beyond the encoder)")
+
+
+if __name__ == '__main__':
+    main()
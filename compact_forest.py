@@ -0,0 +1,262 @@
+"""Model compaction: search for a smaller "lite" forest with accuracy guardrails.
+
+The shipped forest has 100 fully grown trees for ~1,700 training rows. This
+tool retrains the same forest under depth / leaf-size limits, evaluates every
+tree-count prefix of each candidate (a prefix of a random forest is itself a
+valid random forest) with stratified cross-validation on train.py's training
+split, and picks the smallest one whose mean accuracy and Dangerous-class
+recall stay within `--tolerance` minus a safety `--margin` of the reference
+configuration (the shipped model's hyperparameters).
+
+The pick is then refitted on the whole training split and must stay within
+`--tolerance` of the shipped model on train.py's test split, which the
+search never sees (the guardrail); otherwise nothing is written.
+
+The accepted forest is compiled, internal nodes whose two leaves predict
+identical probabilities are merged into one leaf (which never changes a
+prediction), and the result is written in the memory-mappable format of
+mmap_artifacts.py, so the app can load it instead of the full model:
+
+    python compact_forest.py --tolerance 0.01
+    MODEL_ARTIFACT_DIR=random_forest_lite.forest streamlit run app.py
+"""
+import argparse
+import itertools
+import json
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, recall_score
+from sklearn.model_selection import StratifiedKFold
+
+import mmap_artifacts
+from artifacts import (
+    CAT_COLS, TARGET_COL, DATA_PATH, MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH,
+    load_dataset, load_model, load_encoder, load_label_encoder,
+)
+from fast_encoder import FastEncoder
+from forest_engine import CompiledForest
+from train import RANDOM_STATE, split
+
+LITE_ARTIFACT_DIR = 'random_forest_lite.forest'
+REPORT_FILE = 'compaction_report.json'
+
+TREE_COUNTS = (10, 15, 20, 30, 50, 100)
+MAX_DEPTHS = (None, 40, 25, 15)
+MIN_SAMPLES_LEAF = (1, 2, 4)
+CV_FOLDS = 5
+
+
+def merge_identical_leaves(engine):
+    """Copy of `engine` where splits whose two leaves agree are collapsed."""
+    n_nodes = len(engine.feature)
+    left = np.array(engine.left)
+    right = np.array(engine.right)
+    proba = np.array(engine.leaf_proba)
+    leaf = np.array(engine.is_leaf)
+    bounds = list(engine.roots) + [n_nodes]
+    merged = 0
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        # sklearn numbers nodes in pre-order, so children come after parents
+        for node in range(end - 1, start - 1, -1):
+            if leaf[node]:
+                continue
+            l, r = left[node], right[node]
+            if leaf[l] and leaf[r] and np.array_equal(proba[l], proba[r]):
+                leaf[node] = True
+                proba[node] = proba[l]
+                merged += 1
+
+    # Re-number the nodes still reachable from each root, keeping pre-order
+    keep, roots = [], []
+    for root in engine.roots:
+        roots.append(len(keep))
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            keep.append(node)
+            if not leaf[node]:
+                stack.append(right[node])
+                stack.append(left[node])
+    keep = np.array(keep, dtype=np.intp)
+    new_id = np.full(n_nodes, -1, dtype=np.intp)
+    new_id[keep] = np.arange(len(keep))
+    kept_leaf = leaf[keep]
+    self_ids = np.arange(len(keep))
+    compact = CompiledForest(
+        feature=np.where(kept_leaf, 0, np.asarray(engine.feature)[keep]).astype(np.intp),
+        threshold=np.asarray(engine.threshold)[keep].copy(),
+        left=np.where(kept_leaf, self_ids, new_id[left[keep]]).astype(np.intp),
+        right=np.where(kept_leaf, self_ids, new_id[right[keep]]).astype(np.intp),
+        leaf_proba=proba[keep],
+        roots=np.array(roots, dtype=np.intp),
+        classes=np.asarray(engine.classes_).copy(),
+    )
+    return compact, merged
+
+
+def _scores(y_true, proba, classes, dangerous):
+    y_pred = classes[np.argmax(proba, axis=1)]
+    return (float(accuracy_score(y_true, y_pred)),
+            float(recall_score(y_true, y_pred, pos_label=dangerous)))
+
+
+def _cv_scores(X, y, params, tree_counts, folds, dangerous):
+    """Mean (accuracy, recall, total nodes) over `folds` for every tree-count prefix."""
+    scores = np.zeros((len(tree_counts), 3))
+    for fit_idx, val_idx in folds:
+        model = RandomForestClassifier(**params).fit(X[fit_idx], y[fit_idx])
+        # Per-tree probabilities once, then every prefix is a running mean
+        running = np.cumsum(np.stack([e.predict_proba(X[val_idx]) for e in model.estimators_]), axis=0)
+        nodes = np.cumsum([e.tree_.node_count for e in model.estimators_])
+        for i, k in enumerate(tree_counts):
+            scores[i, :2] += _scores(y[val_idx], running[k - 1] / k, model.classes_, dangerous)
+            scores[i, 2] += nodes[k - 1]
+    return scores / len(folds)
+
+
+def search(X_train, y_train, reference_params, dangerous, tolerance, margin=None, cv_folds=CV_FOLDS,
+           tree_counts=TREE_COUNTS, max_depths=MAX_DEPTHS, min_samples_leaf=MIN_SAMPLES_LEAF):
+    """Cross-validate candidates on the training split; returns (reference, all candidates, best or None).
+
+    A candidate is accepted when its mean accuracy and Dangerous recall are
+    within `tolerance - margin` of the reference configuration's (default
+    margin: half the tolerance), so the pick is not chosen at the edge of
+    the tolerance the holdout check applies.
+    """
+    margin = tolerance / 2 if margin is None else margin
+    folds = list(StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=RANDOM_STATE)
+                 .split(X_train, y_train))
+    n_ref = reference_params['n_estimators']
+    ref_acc, ref_recall, ref_nodes = _cv_scores(X_train, y_train, reference_params, [n_ref], folds, dangerous)[0]
+    ref_summary = {
+        'n_trees': n_ref,
+        'total_nodes': int(ref_nodes),
+        'cv_accuracy': round(ref_acc, 4),
+        'cv_dangerous_recall': round(ref_recall, 4),
+    }
+
+    candidates = []
+    allowed = tolerance - margin
+    for depth, leaf in itertools.product(max_depths, min_samples_leaf):
+        params = dict(reference_params, n_estimators=max(tree_counts), max_depth=depth, min_samples_leaf=leaf)
+        scores = _cv_scores(X_train, y_train, params, tree_counts, folds, dangerous)
+        for k, (acc, recall, nodes) in zip(tree_counts, scores):
+            candidates.append({
+                'n_trees': k, 'max_depth': depth, 'min_samples_leaf': leaf,
+                'total_nodes': int(nodes),
+                'cv_accuracy': round(acc, 4), 'cv_dangerous_recall': round(recall, 4),
+                'accepted': bool(acc >= ref_acc - allowed and recall >= ref_recall - allowed),
+            })
+
+    accepted = [c for c in candidates if c['accepted']]
+    best = min(accepted, key=lambda c: (c['total_nodes'], -c['cv_accuracy'])) if accepted else None
+    return ref_summary, candidates, best
+
+
+def compact(data_path=DATA_PATH, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+            label_encoder_path=LABEL_ENCODER_PATH, output_dir=LITE_ARTIFACT_DIR,
+            tolerance=0.01, margin=None, report_path=REPORT_FILE):
+    shipped = load_model(model_path)
+    encoder = FastEncoder.from_sklearn(load_encoder(encoder_path))
+    label_encoder = load_label_encoder(label_encoder_path)
+    dangerous = label_encoder.transform(['Yes'])[0]
+
+    # Encode with the shipped vocabulary so the lite model is a drop-in
+    # replacement, and split exactly like train.py did for the shipped model
+    data = load_dataset(data_path)
+    X = encoder.transform(data[CAT_COLS].to_numpy())
+    y = label_encoder.transform(data[TARGET_COL])
+    X_train, X_test, y_train, y_test = split(X, y)
+
+    reference_params = {k: v for k, v in shipped.get_params().items() if k != 'n_jobs'}
+    reference, candidates, best = search(X_train, y_train, reference_params, dangerous, tolerance, margin)
+
+    report = {
+        'tolerance': tolerance,
+        'margin': tolerance / 2 if margin is None else margin,
+        'rows': {'train': len(y_train), 'holdout': len(y_test)},
+        'reference': reference,
+        'candidates': candidates,
+        'holdout': None,
+        'accepted': None,
+    }
+    if best is not None:
+        # Refit the chosen configuration on every training row, then guard it
+        # against the shipped model on the test split the search never saw
+        params = dict(reference_params, n_estimators=best['n_trees'],
+                      max_depth=best['max_depth'], min_samples_leaf=best['min_samples_leaf'])
+        lite = RandomForestClassifier(**params).fit(X_train, y_train)
+        ship_acc, ship_recall = _scores(y_test, shipped.predict_proba(X_test), shipped.classes_, dangerous)
+        acc, recall = _scores(y_test, lite.predict_proba(X_test), lite.classes_, dangerous)
+        report['holdout'] = {
+            'shipped': {'accuracy': round(ship_acc, 4), 'dangerous_recall': round(ship_recall, 4)},
+            'selected': {'accuracy': round(acc, 4), 'dangerous_recall': round(recall, 4)},
+            'passed': acc >= ship_acc - tolerance and recall >= ship_recall - tolerance,
+        }
+    if best is not None and report['holdout']['passed']:
+        engine, merged = merge_identical_leaves(CompiledForest.from_sklearn(lite))
+        # Merging is exact; confirm on the held-out rows before writing anything
+        if not np.array_equal(engine.predict_proba(X_test), lite.predict_proba(X_test)):
+            raise AssertionError("leaf merging changed predictions")
+        mmap_artifacts.save(output_dir, engine, encoder, label_encoder.classes_, sources={
+            'compacted_from': os.path.basename(model_path),
+            'params': {k: best[k] for k in ('n_trees', 'max_depth', 'min_samples_leaf')},
+        })
+        report['accepted'] = {
+            **{k: v for k, v in best.items() if k != 'accepted'},
+            'total_nodes': int(sum(e.tree_.node_count for e in lite.estimators_)),
+            'holdout_accuracy': report['holdout']['selected']['accuracy'],
+            'holdout_dangerous_recall': report['holdout']['selected']['dangerous_recall'],
+            'merged_leaves': merged,
+            'compiled_nodes': int(len(engine.feature)),
+            'artifact': output_dir,
+            'artifact_bytes': sum(os.path.getsize(os.path.join(output_dir, f)) for f in os.listdir(output_dir)),
+        }
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search for a compact forest within an accuracy tolerance.")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--encoder', default=ENCODER_PATH)
+    parser.add_argument('--label-encoder', default=LABEL_ENCODER_PATH)
+    parser.add_argument('--output', default=LITE_ARTIFACT_DIR)
+    parser.add_argument('--report', default=REPORT_FILE)
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="Max allowed drop in accuracy and in Dangerous recall on the holdout")
+    parser.add_argument('--margin', type=float,
+                        help="Stricter limit for the cross-validated search (default: tolerance / 2)")
+    args = parser.parse_args(argv)
+
+    report = compact(args.data, args.model, args.encoder, args.label_encoder,
+                     args.output, args.tolerance, args.margin, args.report)
+    ref = report['reference']
+    print(f"Reference: {ref['n_trees']} trees, {ref['total_nodes']} nodes, "
+          f"CV accuracy {ref['cv_accuracy']}, Dangerous recall {ref['cv_dangerous_recall']}")
+    best = report['accepted']
+    if best is None:
+        if report['holdout'] is None:
+            print(f"No candidate within tolerance {args.tolerance} in cross-validation; nothing written")
+        else:
+            holdout = report['holdout']
+            print(f"Selected candidate fails the holdout guardrail (accuracy {holdout['selected']['accuracy']}, "
+                  f"Dangerous recall {holdout['selected']['dangerous_recall']} vs shipped "
+                  f"{holdout['shipped']['accuracy']}, {holdout['shipped']['dangerous_recall']}); "
+                  f"nothing written")
+        raise SystemExit(1)
+    print(f"Accepted: {best['n_trees']} trees, max_depth={best['max_depth']}, "
+          f"min_samples_leaf={best['min_samples_leaf']}, {best['compiled_nodes']} nodes "
+          f"({best['merged_leaves']} merged), CV accuracy {best['cv_accuracy']}, "
+          f"Dangerous recall {best['cv_dangerous_recall']}; holdout accuracy {best['holdout_accuracy']}, "
+          f"Dangerous recall {best['holdout_dangerous_recall']} (shipped {report['holdout']['shipped']['accuracy']}, "
+          f"{report['holdout']['shipped']['dangerous_recall']})")
+    print(f"Wrote {best['artifact']} ({best['artifact_bytes']} bytes) and {args.report}")
+
+
+if __name__ == '__main__':
+    main()
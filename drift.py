@@ -0,0 +1,303 @@
+"""Bounded-memory input drift monitor.
+
+Cases whose animal or symptoms the encoder does not know are encoded as
+all-zero columns (`handle_unknown='ignore'`) and scored without complaint.
+`DriftMonitor` sees every case sent to the app, the HTTP server or the batch
+scorer and keeps, per input column and in fixed memory:
+
+* a count-min sketch of value frequencies (`width` x `depth` counters);
+* Space-Saving heavy hitters for the most frequent values overall and for
+  the most frequent unknown values;
+* exact totals of observed, empty and unknown values.
+
+A value is unknown when the live encoder has no column for it
+(`use_encoder`, called again whenever the registry swaps in a model with an
+extended encoder); without an encoder, when the reference never saw it.
+
+`report()` compares the live distribution, estimated from the sketch, with
+the training distribution in drift_reference.json (built from data.csv) using
+the population stability index (PSI) and total variation distance, and raises
+alerts for a PSI or unknown-value rate over threshold once a column has seen
+`min_observations` values. `DriftReporter` logs the report periodically.
+
+Usage:
+    python drift.py reference                    # data.csv -> drift_reference.json
+    python drift.py replay intake.csv            # report for a file of cases
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from artifacts import CAT_COLS, DATA_PATH, ENCODER_PATH
+from metrics import REGISTRY as metrics
+
+logger = logging.getLogger('animal_health.drift')
+
+REFERENCE_PATH = 'drift_reference.json'
+PSI_ALERT = 0.2
+UNKNOWN_RATE_ALERT = 0.05
+
+
+class CountMinSketch:
+    """Frequency estimates that never undercount, in width * depth counters."""
+
+    def __init__(self, width=2048, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+
+    def _columns(self, value):
+        # Two halves of one 128-bit digest give `depth` hash functions
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, value, count=1):
+        self.table[self._rows, self._columns(value)] += count
+
+    def estimate(self, value):
+        return int(self.table[self._rows, self._columns(value)].min())
+
+
+class SpaceSaving:
+    """The `capacity` most frequent values; counts overestimate by at most `error`."""
+
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, value, count=1):
+        if value in self.counts:
+            self.counts[value] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = count
+            self.errors[value] = 0
+        else:
+            # Replace the smallest counter and inherit its count as the error bound
+            victim = min(self.counts, key=self.counts.get)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[value] = floor + count
+            self.errors[value] = floor
+
+    def top(self, n=10):
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+        return [{'value': v, 'count': c, 'error': self.errors[v]} for v, c in ranked]
+
+
+class ColumnMonitor:
+    def __init__(self, reference, width, depth, capacity):
+        self.reference = reference
+        self.reference_total = sum(reference.values())
+        # Values the encoder has a column for (DriftMonitor.use_encoder)
+        self.known = reference
+        self.sketch = CountMinSketch(width, depth)
+        self.heavy = SpaceSaving(capacity)
+        self.unknown_heavy = SpaceSaving(capacity)
+        self.observed = 0
+        self.empty = 0
+        self.unknown = 0
+
+    def add(self, value, count=1):
+        if not value:
+            self.empty += count
+            return
+        self.observed += count
+        self.sketch.add(value, count)
+        self.heavy.add(value, count)
+        if value not in self.known:
+            self.unknown += count
+            self.unknown_heavy.add(value, count)
+
+    def distances(self):
+        """(PSI, total variation) of live vs reference over the reference values + unknown."""
+        if not self.observed or not self.reference_total:
+            return None, None
+        eps = 1e-4
+        psi = tvd = 0.0
+        for value, ref_count in self.reference.items():
+            live = min(self.sketch.estimate(value), self.observed)
+            p, q = live / self.observed, ref_count / self.reference_total
+            psi += (p - q) * math.log(max(p, eps) / max(q, eps))
+            tvd += abs(p - q)
+        # Sketch estimates can overcount, so unknown comes from the exact counter
+        p = self.unknown / self.observed
+        psi += p * math.log(max(p, eps) / eps)
+        tvd += p
+        return psi, tvd / 2
+
+
+class DriftMonitor:
+    """Per-column sketches of every observed case, compared with a reference."""
+
+    def __init__(self, reference, columns=CAT_COLS, width=2048, depth=4, capacity=32,
+                 min_observations=200, psi_alert=PSI_ALERT, unknown_rate_alert=UNKNOWN_RATE_ALERT,
+                 encoder=None):
+        self.columns = list(columns)
+        self.monitors = {
+            col: ColumnMonitor(reference.get(col, {}), width, depth, capacity) for col in self.columns
+        }
+        self.min_observations = min_observations
+        self.psi_alert = psi_alert
+        self.unknown_rate_alert = unknown_rate_alert
+        self.cases = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+        if encoder is not None:
+            self.use_encoder(encoder)
+
+    @classmethod
+    def from_file(cls, path=REFERENCE_PATH, **kwargs):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['columns'], **kwargs)
+
+    def use_encoder(self, encoder):
+        """Count as unknown only values `encoder` (a FastEncoder) has no column for.
+
+        Values seen before the switch keep the verdict they were counted with.
+        """
+        if len(encoder.lookup) != len(self.columns):
+            raise ValueError(f"Encoder has {len(encoder.lookup)} columns, expected {len(self.columns)}")
+        with self._lock:
+            for col, lookup in zip(self.columns, encoder.lookup):
+                self.monitors[col].known = lookup
+
+    def observe(self, row):
+        """One case as [animal, s1, ..., s5]; None and '' are empty slots."""
+        unknown = []
+        with self._lock:
+            self.cases += 1
+            for col, value in zip(self.columns, row):
+                monitor = self.monitors[col]
+                value = value or ''
+                monitor.add(value)
+                if value and value not in monitor.known:
+                    unknown.append(col)
+        for col in unknown:
+            metrics.inc('unknown_categories_total', column=col)
+
+    def observe_many(self, rows):
+        """A batch of cases; sketches are updated once per distinct value."""
+        rows = np.asarray(rows, dtype=object)
+        if not len(rows):
+            return
+        per_column = [Counter(rows[:, j]) for j in range(len(self.columns))]
+        with self._lock:
+            self.cases += len(rows)
+            for col, counts in zip(self.columns, per_column):
+                monitor = self.monitors[col]
+                for value, count in counts.items():
+                    monitor.add(value or '', count)
+        for col, counts in zip(self.columns, per_column):
+            known = self.monitors[col].known
+            n = sum(c for v, c in counts.items() if v and v not in known)
+            if n:
+                metrics.inc('unknown_categories_total', n, column=col)
+
+    def report(self, top=10):
+        columns, alerts = {}, []
+        with self._lock:
+            for col, m in self.monitors.items():
+                psi, tvd = m.distances()
+                unknown_rate = m.unknown / m.observed if m.observed else 0.0
+                columns[col] = {
+                    'observed': m.observed,
+                    'empty': m.empty,
+                    'unknown': m.unknown,
+                    'unknown_rate': round(unknown_rate, 4),
+                    'psi': None if psi is None else round(psi, 4),
+                    'total_variation': None if tvd is None else round(tvd, 4),
+                    'top_values': m.heavy.top(top),
+                    'top_unknown': m.unknown_heavy.top(top),
+                }
+                if m.observed < self.min_observations:
+                    continue
+                if psi is not None and psi > self.psi_alert:
+                    alerts.append(f"{col}: PSI {psi:.3f} > {self.psi_alert}")
+                if unknown_rate > self.unknown_rate_alert:
+                    alerts.append(f"{col}: {unknown_rate:.1%} unknown values > {self.unknown_rate_alert:.0%}")
+            cases = self.cases
+        return {
+            'cases': cases,
+            'since': round(self.started, 3),
+            'columns': columns,
+            'alerts': alerts,
+        }
+
+
+class DriftReporter(threading.Thread):
+    """Logs a drift report every `interval` seconds, with a warning per alert."""
+
+    def __init__(self, monitor, interval=300.0, log=logger):
+        super().__init__(name='drift-reporter', daemon=True)
+        self.monitor = monitor
+        self.interval = interval
+        self.log = log
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            report = self.monitor.report(top=5)
+            self.log.info(json.dumps({'event': 'drift', 'ts': round(time.time(), 3), **report}))
+            for alert in report['alerts']:
+                metrics.inc('drift_alerts_total')
+                self.log.warning("Input drift: %s", alert)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def build_reference(data_path=DATA_PATH):
+    """Per-column value counts of the training data (after load_dataset's cleaning)."""
+    from artifacts import file_sha256, load_dataset
+    data = load_dataset(data_path)
+    return {
+        'source': {'path': data_path, 'sha256': file_sha256(data_path), 'rows': int(len(data))},
+        'columns': {
+            col: {str(k): int(v) for k, v in data[col].value_counts().sort_index().items()}
+            for col in CAT_COLS
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the drift reference or replay cases through the monitor.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    ref = sub.add_parser('reference')
+    ref.add_argument('--data', default=DATA_PATH)
+    ref.add_argument('--output', default=REFERENCE_PATH)
+    rep = sub.add_parser('replay')
+    rep.add_argument('input', help="CSV with AnimalName,symptoms1..symptoms5 columns")
+    rep.add_argument('--reference', default=REFERENCE_PATH)
+    rep.add_argument('--encoder', default=ENCODER_PATH, help="Encoder whose categories count as known")
+    args = parser.parse_args(argv)
+
+    if args.command == 'reference':
+        reference = build_reference(args.data)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reference, f, indent=1, ensure_ascii=False)
+        sizes = ', '.join(f"{col} {len(v)}" for col, v in reference['columns'].items())
+        print(f"Wrote {args.output} from {reference['source']['rows']} rows ({sizes})")
+        return
+
+    import pandas as pd
+    from artifacts import load_encoder
+    from fast_encoder import FastEncoder
+    monitor = DriftMonitor.from_file(args.reference, encoder=FastEncoder.from_sklearn(load_encoder(args.encoder)))
+    for chunk in pd.read_csv(args.input, chunksize=50000, dtype=str, keep_default_na=False):
+        monitor.observe_many(chunk[CAT_COLS].to_numpy())
+    print(json.dumps(monitor.report(), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""DataFrame-free replacement for the pickled OneHotEncoder on the request path.
+
+The notebook fitted `OneHotEncoder(sparse_output=False, handle_unknown='ignore')`
+over AnimalName and symptoms1..symptoms5. `FastEncoder` precomputes a
+category -> output column map from that fitted encoder and turns raw strings
+straight into active column indices, a dense row or a CSR batch. Unknown
+values (including the '' placeholder for empty slots) activate nothing, just
+like `handle_unknown='ignore'`, and the dense output is bit-identical to
+`encoder.transform`.
+
+Run `python fast_encoder.py` to check it against the pickled encoder on data.csv.
+"""
+import argparse
+
+import numpy as np
+
+
+class FastEncoder:
+    """Category-to-column lookup built from a fitted OneHotEncoder."""
+
+    def __init__(self, categories, columns=None):
+        self.categories = [list(c) for c in categories]
+        self.columns = list(columns) if columns is not None else None
+        self.offsets = np.cumsum([0] + [len(c) for c in self.categories])
+        self.n_features = int(self.offsets[-1])
+        self.lookup = [
+            {cat: int(offset) + j for j, cat in enumerate(cats)}
+            for offset, cats in zip(self.offsets, self.categories)
+        ]
+
+    @classmethod
+    def from_sklearn(cls, encoder):
+        if getattr(encoder, 'drop', None) is not None:
+            raise ValueError("FastEncoder does not support encoders fitted with drop=")
+        if getattr(encoder, 'handle_unknown', 'ignore') != 'ignore':
+            raise ValueError("FastEncoder only reproduces handle_unknown='ignore'")
+        return cls(encoder.categories_, getattr(encoder, 'feature_names_in_', None))
+
+    def active_indices(self, values):
+        """Output columns set to 1 for one case given as [animal, s1, ..., s5]."""
+        if len(values) != len(self.lookup):
+            raise ValueError(f"Expected {len(self.lookup)} values, got {len(values)}")
+        indices = []
+        for lookup, value in zip(self.lookup, values):
+            idx = lookup.get(value)
+            if idx is not None:
+                indices.append(idx)
+        return indices
+
+    def transform_one(self, values):
+        """Dense float64 row of shape (1, n_features) for one case."""
+        row = np.zeros((1, self.n_features), dtype=np.float64)
+        row[0, self.active_indices(values)] = 1.0
+        return row
+
+    def column_indices(self, rows):
+        """(n_rows, n_columns) int array of active columns; -1 where unknown."""
+        rows = np.asarray(rows, dtype=object)
+        if rows.ndim != 2 or rows.shape[1] != len(self.lookup):
+            raise ValueError(f"Expected rows of {len(self.lookup)} values")
+        out = np.empty(rows.shape, dtype=np.intp)
+        for j, lookup in enumerate(self.lookup):
+            out[:, j] = [lookup.get(v, -1) for v in rows[:, j]]
+        return out
+
+    def transform_sparse(self, rows):
+        """CSR matrix with the same values as the dense encoder output."""
+        from scipy import sparse
+        idx = self.column_indices(rows)
+        known = idx >= 0
+        indptr = np.concatenate([[0], np.cumsum(known.sum(axis=1))])
+        indices = idx[known]
+        data = np.ones(len(indices), dtype=np.float64)
+        return sparse.csr_matrix((data, indices, indptr), shape=(idx.shape[0], self.n_features))
+
+    def transform(self, rows):
+        """Dense float64 matrix, bit-identical to the fitted encoder's output."""
+        idx = self.column_indices(rows)
+        out = np.zeros((idx.shape[0], self.n_features), dtype=np.float64)
+        r, c = np.nonzero(idx >= 0)
+        out[r, idx[r, c]] = 1.0
+        return out
+
+
+def main(argv=None):
+    import pandas as pd
+    from artifacts import CAT_COLS, ENCODER_PATH, load_encoder
+
+    parser = argparse.ArgumentParser(description="Check FastEncoder against the pickled OneHotEncoder.")
+    parser.add_argument('--data', default='data.csv')
+    parser.add_argument('--encoder', default=ENCODER_PATH)
+    args = parser.parse_args(argv)
+
+    encoder = load_encoder(args.encoder)
+    fast = FastEncoder.from_sklearn(encoder)
+    df = pd.read_csv(args.data, dtype=str, keep_default_na=False)[CAT_COLS]
+    # Blank a slot and add an unseen value to exercise handle_unknown='ignore'
+    df.iloc[0, 5] = ''
+    df.iloc[1, 0] = 'Unicorn'
+    expected = encoder.transform(df)
+    rows = df.to_numpy()
+    if not np.array_equal(fast.transform(rows), expected):
+        raise AssertionError("dense output differs from OneHotEncoder")
+    if not np.array_equal(fast.transform_sparse(rows).toarray(), expected):
+        raise AssertionError("sparse output differs from OneHotEncoder")
+    for i in range(len(rows)):
+        if not np.array_equal(fast.transform_one(list(rows[i])), expected[i:i + 1]):
+            raise AssertionError(f"row {i} differs from OneHotEncoder")
+    print(f"Encoder OK: {len(rows)} rows, {fast.n_features} columns identical to OneHotEncoder")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""Incremental model updates from newly labeled cases.
+
+Instead of retraining from scratch, an update:
+
+1. reads a CSV of confirmed cases (AnimalName, symptoms1..symptoms5, Dangerous);
+2. extends the one-hot vocabulary with any unseen animals/symptoms, appending
+   them in sorted order at the end of their column so the update is
+   deterministic, and re-points the existing trees at the shifted columns
+   (verified to leave their predictions unchanged);
+3. warm-starts the forest with `--extra-trees` new trees fitted on the new
+   cases plus a random sample of the existing data;
+4. reports validation metrics of the old and updated model on the old
+   held-out split and on held-out new cases, so drift is visible;
+5. writes a versioned artifact set (see train.py) and appends the cases to
+   the dataset store.
+
+Usage:
+    python incremental.py new_cases.csv --extra-trees 10 --old-sample 0.25
+    python incremental.py new_cases.csv --publish
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, recall_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import OneHotEncoder
+from sklearn.tree._tree import Tree
+
+from artifacts import (
+    CAT_COLS, TARGET_COL, DATA_PATH, MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH,
+    load_dataset, load_model, load_encoder, load_label_encoder,
+)
+from train import MODELS_DIR, METRICS_FILE, RANDOM_STATE, new_version, publish, write_artifacts
+
+
+def read_cases(path, label_encoder):
+    cases = pd.read_csv(path, dtype=str, keep_default_na=False)
+    missing = [c for c in CAT_COLS + [TARGET_COL] if c not in cases.columns]
+    if missing:
+        raise ValueError(f"New cases are missing columns: {', '.join(missing)}")
+    cases = cases[CAT_COLS + [TARGET_COL]]
+    unknown = set(cases[TARGET_COL]) - set(label_encoder.classes_)
+    if unknown:
+        raise ValueError(f"Unknown labels in {path}: {', '.join(sorted(unknown))}")
+    return cases
+
+
+def extend_encoder(encoder, frames):
+    """Encoder whose vocabulary also covers `frames`, plus the old -> new column map.
+
+    Unseen values are appended, sorted, after the existing categories of their
+    column; '' is the empty-slot placeholder and never becomes a category.
+    """
+    categories, added, index_map = [], {}, []
+    offset = 0
+    for col, known in zip(CAT_COLS, encoder.categories_):
+        known = list(known)
+        seen = set(known)
+        values = set()
+        for frame in frames:
+            values.update(frame[col])
+        new = sorted(v for v in values - seen if isinstance(v, str) and v)
+        if new:
+            added[col] = new
+        index_map.extend(range(offset, offset + len(known)))
+        offset += len(known) + len(new)
+        categories.append(known + new)
+
+    extended = OneHotEncoder(categories=categories, sparse_output=False, handle_unknown='ignore')
+    extended.fit(pd.concat([f[CAT_COLS] for f in frames], ignore_index=True))
+    return extended, np.array(index_map, dtype=np.intp), added
+
+
+def remap_forest(model, index_map, n_features):
+    """Re-point every tree's split features through `index_map`, in place."""
+    for est in model.estimators_:
+        state = est.tree_.__getstate__()
+        nodes = state['nodes'].copy()
+        internal = nodes['left_child'] != -1
+        nodes['feature'][internal] = index_map[nodes['feature'][internal]]
+        state['nodes'] = nodes
+        tree = Tree(n_features, np.asarray([est.n_classes_], dtype=np.intp), est.n_outputs_)
+        tree.__setstate__(state)
+        est.tree_ = tree
+        est.n_features_in_ = n_features
+    model.n_features_in_ = n_features
+    for est in [model] + list(model.estimators_):
+        if hasattr(est, 'feature_names_in_'):
+            del est.feature_names_in_
+
+
+def _scores(model, X, y, dangerous):
+    if len(y) == 0:
+        return None
+    y_pred = model.predict(X)
+    return {
+        'rows': int(len(y)),
+        'accuracy': round(float(accuracy_score(y, y_pred)), 4),
+        'dangerous_recall': round(float(recall_score(y, y_pred, pos_label=dangerous, zero_division=0)), 4),
+    }
+
+
+def _drift(before, after):
+    if before is None:
+        return None
+    return {k: round(after[k] - before[k], 4) for k in ('accuracy', 'dangerous_recall')}
+
+
+def append_cases(data_path, cases):
+    """Append `cases` to the CSV store, starting a new line if the file lacks a final newline."""
+    needs_newline = False
+    with open(data_path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    with open(data_path, 'a', encoding='utf-8', newline='') as f:
+        if needs_newline:
+            f.write('\n')
+        cases.to_csv(f, header=False, index=False, lineterminator='\n')
+
+
+def update(cases_path, data_path=DATA_PATH, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+           label_encoder_path=LABEL_ENCODER_PATH, output_dir=MODELS_DIR, version=None,
+           extra_trees=10, old_sample=0.25, holdout=0.2, append=True):
+    """Warm-start update; returns (artifact directory, metrics dict)."""
+    start = time.perf_counter()
+    version = version or new_version()
+    target = os.path.join(output_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"Artifact version already exists: {target}")
+
+    model = load_model(model_path)
+    encoder = load_encoder(encoder_path)
+    label_encoder = load_label_encoder(label_encoder_path)
+    dangerous = label_encoder.transform(['Yes'])[0]
+
+    old = load_dataset(data_path)
+    cases = read_cases(cases_path, label_encoder)
+    y_old = label_encoder.transform(old[TARGET_COL])
+    y_new = label_encoder.transform(cases[TARGET_COL])
+
+    # Hold out some new cases for validation when there are enough of them
+    new_idx = np.arange(len(cases))
+    new_fit, new_val = new_idx, new_idx[:0]
+    if holdout and len(cases) >= 10:
+        stratify = y_new if np.bincount(y_new).min() >= 2 else None
+        new_fit, new_val = train_test_split(new_idx, test_size=holdout, random_state=RANDOM_STATE,
+                                            stratify=stratify)
+    old_train, old_val = train_test_split(np.arange(len(old)), test_size=0.2, random_state=RANDOM_STATE,
+                                          stratify=y_old)
+
+    # Scores of the current model, in its own feature space
+    X_old_enc = encoder.transform(old[CAT_COLS])
+    X_new_enc = encoder.transform(cases[CAT_COLS])
+    before = {
+        'old_holdout': _scores(model, X_old_enc[old_val], y_old[old_val], dangerous),
+        'new_holdout': _scores(model, X_new_enc[new_val], y_new[new_val], dangerous),
+    }
+    reference = model.predict_proba(X_old_enc[:200])
+
+    extended, index_map, added = extend_encoder(encoder, [old, cases])
+    X_old = extended.transform(old[CAT_COLS])
+    X_new = extended.transform(cases[CAT_COLS])
+    remap_forest(model, index_map, X_old.shape[1])
+    if not np.array_equal(model.predict_proba(X_old[:200]), reference):
+        raise AssertionError("re-pointing the existing trees changed their predictions")
+
+    # Old rows for the new trees never come from old_val, so "after" stays a holdout score
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample = rng.choice(old_train, size=min(int(round(old_sample * len(old))), len(old_train)),
+                        replace=False)
+    X_fit = np.vstack([X_new[new_fit], X_old[sample]])
+    y_fit = np.concatenate([y_new[new_fit], y_old[sample]])
+    if len(np.unique(y_fit)) < len(label_encoder.classes_):
+        raise ValueError("Update data must contain every class; raise --old-sample")
+
+    n_before = len(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=n_before + extra_trees, n_jobs=-1)
+    fit_start = time.perf_counter()
+    model.fit(X_fit, y_fit)
+    fit_seconds = time.perf_counter() - fit_start
+    model.set_params(warm_start=False, n_jobs=None)
+
+    after = {
+        'old_holdout': _scores(model, X_old[old_val], y_old[old_val], dangerous),
+        'new_holdout': _scores(model, X_new[new_val], y_new[new_val], dangerous),
+    }
+    metrics = {
+        'version': version,
+        'created_utc': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'update': {
+            'base_model': os.path.abspath(model_path),
+            'new_cases': int(len(cases)),
+            'new_cases_fit': int(len(new_fit)),
+            'old_rows_sampled': int(len(sample)),
+            'trees_before': n_before,
+            'trees_after': len(model.estimators_),
+            'vocabulary_added': added,
+            'n_features': int(X_old.shape[1]),
+            'fit_seconds': round(fit_seconds, 3),
+        },
+        'validation_before': before,
+        'validation_after': after,
+        'drift': {name: _drift(before[name], after[name]) for name in before},
+    }
+    write_artifacts(target, model, extended, label_encoder, metrics)
+    if append:
+        # Only once the update succeeded, so a failed run leaves the store untouched
+        append_cases(data_path, cases)
+    metrics['update']['total_seconds'] = round(time.perf_counter() - start, 3)
+    with open(os.path.join(target, METRICS_FILE), 'w') as f:
+        json.dump(metrics, f, indent=2)
+    return target, metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extend the forest with newly labeled cases.")
+    parser.add_argument('cases', help="CSV with AnimalName,symptoms1..symptoms5,Dangerous")
+    parser.add_argument('--data', default=DATA_PATH, help="Dataset store the cases are appended to")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--encoder', default=ENCODER_PATH)
+    parser.add_argument('--label-encoder', default=LABEL_ENCODER_PATH)
+    parser.add_argument('--output-dir', default=MODELS_DIR)
+    parser.add_argument('--version')
+    parser.add_argument('--extra-trees', type=int, default=10)
+    parser.add_argument('--old-sample', type=float, default=0.25,
+                        help="Fraction of the existing data mixed into the update")
+    parser.add_argument('--holdout', type=float, default=0.2,
+                        help="Fraction of new cases kept for validation")
+    parser.add_argument('--no-append', action='store_true', help="Don't append the cases to the store")
+    parser.add_argument('--publish', action='store_true')
+    args = parser.parse_args(argv)
+
+    target, metrics = update(
+        args.cases, args.data, args.model, args.encoder, args.label_encoder, args.output_dir,
+        args.version, args.extra_trees, args.old_sample, args.holdout, append=not args.no_append)
+    info = metrics['update']
+    print(f"Saved artifacts to {target} in {info['total_seconds']}s "
+          f"({info['trees_before']} -> {info['trees_after']} trees, "
+          f"{sum(len(v) for v in info['vocabulary_added'].values())} new categories)")
+    for name, drift in metrics['drift'].items():
+        if drift is not None:
+            after = metrics['validation_after'][name]
+            print(f"  {name}: accuracy {after['accuracy']} ({drift['accuracy']:+}), "
+                  f"Dangerous recall {after['dangerous_recall']} ({drift['dangerous_recall']:+})")
+    if args.publish:
+        publish(target)
+        print("Published to the app's artifact paths")
+
+
+if __name__ == '__main__':
+    main()
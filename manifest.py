@@ -0,0 +1,102 @@
+"""Vocabulary manifest emitted alongside the model artifacts.
+
+The app used to read all of data.csv on cold start just to fill its two
+selectboxes, and the resulting symptom list contained values the encoder
+does not know. The manifest is a small JSON file derived from the fitted
+`OneHotEncoder.categories_` instead: the animal list, the symptom vocabulary
+(overall and per slot) and checksums of the artifact files it describes, so
+the UI can start without pandas, sklearn or the dataset.
+
+Usage:
+    python manifest.py                 # vocabulary.json for the shipped artifacts
+    python manifest.py --check         # verify it still matches the artifact files
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+
+from artifacts import CAT_COLS, MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH, file_sha256
+
+MANIFEST_PATH = 'vocabulary.json'
+FORMAT_VERSION = 1
+
+
+def _clean(values):
+    # Drop the '' placeholder and any non-string (NaN) categories
+    return [v for v in values if isinstance(v, str) and v.strip()]
+
+
+def _sort_key(value):
+    return (value.strip().lower(), value)
+
+
+def build_manifest(encoder, artifact_paths=(MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH)):
+    """Manifest dict for a fitted OneHotEncoder and the files it ships with."""
+    columns = list(getattr(encoder, 'feature_names_in_', CAT_COLS))
+    categories = dict(zip(columns, (list(c) for c in encoder.categories_)))
+    by_slot = {col: sorted(_clean(categories[col]), key=_sort_key) for col in columns[1:]}
+    symptoms = sorted({s for values in by_slot.values() for s in values}, key=_sort_key)
+    return {
+        'format_version': FORMAT_VERSION,
+        'created_utc': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'animals': sorted(_clean(categories[columns[0]]), key=_sort_key),
+        'symptoms': symptoms,
+        'symptoms_by_slot': by_slot,
+        'artifacts': {
+            os.path.basename(p): {'sha256': file_sha256(p), 'bytes': os.path.getsize(p)}
+            for p in artifact_paths if os.path.exists(p)
+        },
+    }
+
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    # Replace atomically: readers (and the model registry) never see half a file
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported manifest format version: {manifest.get('format_version')}")
+    return manifest
+
+
+def stale_artifacts(manifest, directory='.'):
+    """Names of listed artifact files whose checksum no longer matches."""
+    stale = []
+    for name, info in manifest['artifacts'].items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path) or file_sha256(path) != info['sha256']:
+            stale.append(name)
+    return stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write or check the vocabulary manifest.")
+    parser.add_argument('--encoder', default=ENCODER_PATH)
+    parser.add_argument('--output', default=MANIFEST_PATH)
+    parser.add_argument('--check', action='store_true', help="Verify the manifest against the artifacts")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        manifest = load_manifest(args.output)
+        stale = stale_artifacts(manifest, os.path.dirname(args.output) or '.')
+        if stale:
+            print(f"Manifest is stale for: {', '.join(stale)}")
+            raise SystemExit(1)
+        print(f"{args.output} matches {len(manifest['artifacts'])} artifact files")
+        return
+
+    from artifacts import load_encoder
+    manifest = build_manifest(load_encoder(args.encoder))
+    write_manifest(manifest, args.output)
+    print(f"Wrote {args.output}: {len(manifest['animals'])} animals, {len(manifest['symptoms'])} symptoms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Always-on, low-overhead instrumentation for the prediction path.
+
+A `MetricsRegistry` keeps a fixed-bucket latency histogram per stage (encode,
+predict, advice rendering, ...) and plain counters (predictions, validation
+errors, Dangerous / Not Dangerous outcomes). Recording is a lock plus a
+bisect over the bucket bounds, so it can stay enabled in production.
+
+The numbers can be exported as Prometheus text (`render_prometheus`, served
+by `start_http_exporter`) or as a periodic structured JSON log line
+(`PeriodicReporter`). `REGISTRY` is the process-wide default used by the app
+and the HTTP server.
+"""
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('animal_health.metrics')
+
+# Upper bounds in seconds, from sub-millisecond encode to multi-second reruns
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # One slot per bound plus the +Inf overflow
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-quantile (an upper estimate)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+class MetricsRegistry:
+    def __init__(self, namespace='animal_health', buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            hist = self._histograms.get(stage)
+            if hist is None:
+                hist = self._histograms[stage] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def record_outcome(self, dangerous, count=1):
+        self.inc('predictions_total', count)
+        self.inc('outcomes_total', count, outcome='dangerous' if dangerous else 'not_dangerous')
+
+    def snapshot(self):
+        """Plain-dict view: counters plus count/mean/p50/p99 per stage (ms)."""
+        with self._lock:
+            counters = {name + _labels(labels): value for (name, labels), value in self._counters.items()}
+            stages = {
+                stage: {
+                    'count': h.count,
+                    'mean_ms': round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                    'p50_ms': round(h.quantile(0.5) * 1000, 3),
+                    'p99_ms': round(h.quantile(0.99) * 1000, 3),
+                }
+                for stage, h in self._histograms.items()
+            }
+        return {'counters': counters, 'stages': stages}
+
+    def render_prometheus(self):
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            if self._histograms:
+                lines.append(f'# HELP {ns}_stage_seconds Latency of each prediction stage.')
+                lines.append(f'# TYPE {ns}_stage_seconds histogram')
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(h.bounds, h.counts):
+                    cumulative += n
+                    lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{ns}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{ns}_stage_seconds_sum{{stage="{stage}"}} {h.sum:.9f}')
+                lines.append(f'{ns}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {ns}_{name} counter')
+                    typed.add(name)
+                lines.append(f'{ns}_{name}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def log_line(self):
+        return json.dumps({'event': 'metrics', 'ts': round(time.time(), 3), **self.snapshot()})
+
+
+class PeriodicReporter(threading.Thread):
+    """Logs `registry.log_line()` every `interval` seconds until stopped."""
+
+    def __init__(self, registry, interval=60.0, log=logger):
+        super().__init__(name='metrics-reporter', daemon=True)
+        self.registry = registry
+        self.interval = interval
+        self.log = log
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.log.info(self.registry.log_line())
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_http_exporter(registry, host='127.0.0.1', port=9108):
+    """Serve `GET /metrics` in Prometheus text format from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+    return server
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,183 @@
+"""Memory-mappable model artifact format shared across worker processes.
+
+Each app process used to unpickle its own copy of the joblib forest and the
+pickled encoders. This format stores the compiled forest's node arrays, the
+encoder vocabulary and the label classes as plain `.npy` files in one
+directory. `load_*` opens them with `np.load(mmap_mode='r')`, so cold start
+does no parsing or object construction for the forest, and every process on
+the host maps the same read-only pages from the OS page cache.
+
+Layout of `random_forest_model.forest/`:
+
+    meta.json                    format version, source file checksums, shapes
+    forest_<array>.npy           CompiledForest node arrays
+    encoder_categories.npy       all one-hot categories, column after column
+    encoder_offsets.npy          start of each input column in the above
+    encoder_columns.npy          input column names
+    label_classes.npy            LabelEncoder.classes_
+
+`random_forest_model.forest` is a symlink to a sibling version directory
+(`random_forest_model.forest.<version>`). Files that a running process has
+mapped are never rewritten: `save` writes a fresh version directory and
+swaps the symlink with an atomic rename, so processes keep their old,
+consistent mapping until they reload, and loaders resolve the link once so
+all arrays come from one version. Versions other than the live and the
+previous one are removed (unlinking a mapped file is safe).
+
+Usage:
+    python mmap_artifacts.py convert            # from the joblib/pickle files
+    python mmap_artifacts.py convert --output /srv/model.forest
+"""
+import argparse
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+
+from artifacts import MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH, file_sha256
+from fast_encoder import FastEncoder
+from forest_engine import CompiledForest
+
+ARTIFACT_DIR = 'random_forest_model.forest'
+META_FILE = 'meta.json'
+FORMAT_VERSION = 1
+
+
+def _save(directory, name, array):
+    np.save(os.path.join(directory, name + '.npy'), np.ascontiguousarray(array), allow_pickle=False)
+
+
+def _load(directory, name):
+    return np.load(os.path.join(directory, name + '.npy'), mmap_mode='r', allow_pickle=False)
+
+
+def _activate(output_dir, version_dir):
+    """Point the `output_dir` symlink at `version_dir`; returns the previous target."""
+    previous = os.path.realpath(output_dir) if os.path.islink(output_dir) else None
+    if os.path.isdir(output_dir) and not os.path.islink(output_dir):
+        # Plain directory from an older release: move it aside once (mapped
+        # files survive a rename); the path is briefly missing during this step
+        previous = f'{output_dir}.legacy-{uuid.uuid4().hex[:8]}'
+        os.rename(output_dir, previous)
+    link = f'{output_dir}.link-{uuid.uuid4().hex[:8]}'
+    os.symlink(os.path.basename(version_dir), link)
+    os.replace(link, output_dir)
+    return previous
+
+
+def _prune(output_dir, keep):
+    parent = os.path.dirname(output_dir) or '.'
+    prefix = os.path.basename(output_dir) + '.'
+    keep = {os.path.realpath(p) for p in keep if p}
+    for entry in os.scandir(parent):
+        if entry.name.startswith(prefix) and entry.is_dir(follow_symlinks=False) \
+                and os.path.realpath(entry.path) not in keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def save(output_dir, engine, encoder, label_classes, sources=None):
+    """Write a compiled forest, FastEncoder and label classes as raw arrays.
+
+    The arrays go into a new version directory that `output_dir` is then
+    switched to; nothing already on disk is modified in place.
+    """
+    output_dir = os.path.normpath(output_dir)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    version_dir = f'{output_dir}.{stamp}-{uuid.uuid4().hex[:8]}'
+    os.makedirs(version_dir)
+    meta = _write(version_dir, engine, encoder, label_classes, sources)
+    previous = _activate(output_dir, version_dir)
+    _prune(output_dir, keep=[version_dir, previous])
+    return meta
+
+
+def _write(output_dir, engine, encoder, label_classes, sources):
+    for name in CompiledForest.ARRAYS:
+        _save(output_dir, 'forest_' + name, getattr(engine, name))
+    _save(output_dir, 'encoder_categories', np.array(
+        [c for cats in encoder.categories for c in cats], dtype=str))
+    _save(output_dir, 'encoder_offsets', np.asarray(encoder.offsets, dtype=np.int64))
+    _save(output_dir, 'encoder_columns', np.array(encoder.columns or [], dtype=str))
+    _save(output_dir, 'label_classes', np.asarray(label_classes, dtype=str))
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'n_trees': engine.n_trees,
+        'n_nodes': int(len(engine.feature)),
+        'n_features': encoder.n_features,
+        'sources': sources or {},
+    }
+    # meta.json is written last so an incomplete version directory is never loadable
+    with open(os.path.join(output_dir, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def read_meta(artifact_dir=ARTIFACT_DIR):
+    with open(os.path.join(artifact_dir, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {meta.get('format_version')}")
+    return meta
+
+
+def load_forest(artifact_dir=ARTIFACT_DIR):
+    """CompiledForest whose node arrays are read-only memory maps."""
+    artifact_dir = os.path.realpath(artifact_dir)
+    read_meta(artifact_dir)
+    arrays = {name: _load(artifact_dir, 'forest_' + name) for name in CompiledForest.ARRAYS}
+    arrays['classes'] = arrays.pop('classes_')
+    return CompiledForest(**arrays)
+
+
+def load_fast_encoder(artifact_dir=ARTIFACT_DIR):
+    artifact_dir = os.path.realpath(artifact_dir)
+    read_meta(artifact_dir)
+    categories = _load(artifact_dir, 'encoder_categories').tolist()
+    offsets = _load(artifact_dir, 'encoder_offsets').tolist()
+    columns = _load(artifact_dir, 'encoder_columns').tolist() or None
+    per_column = [categories[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+    return FastEncoder(per_column, columns)
+
+
+def load_label_classes(artifact_dir=ARTIFACT_DIR):
+    artifact_dir = os.path.realpath(artifact_dir)
+    read_meta(artifact_dir)
+    return _load(artifact_dir, 'label_classes').tolist()
+
+
+def convert(model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+            label_encoder_path=LABEL_ENCODER_PATH, output_dir=ARTIFACT_DIR):
+    """Convert the joblib/pickle artifacts into the memory-mappable format."""
+    # sklearn is only needed to read the source files, not to load the result
+    from artifacts import load_model, load_encoder, load_label_encoder
+
+    engine = CompiledForest.from_sklearn(load_model(model_path))
+    encoder = FastEncoder.from_sklearn(load_encoder(encoder_path))
+    label_classes = load_label_encoder(label_encoder_path).classes_
+    sources = {
+        os.path.basename(p): file_sha256(p)
+        for p in (model_path, encoder_path, label_encoder_path)
+    }
+    return save(output_dir, engine, encoder, label_classes, sources)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory-mappable model artifacts.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_convert = sub.add_parser('convert', help="Convert joblib/pickle artifacts")
+    p_convert.add_argument('--model', default=MODEL_PATH)
+    p_convert.add_argument('--encoder', default=ENCODER_PATH)
+    p_convert.add_argument('--label-encoder', default=LABEL_ENCODER_PATH)
+    p_convert.add_argument('--output', default=ARTIFACT_DIR)
+    args = parser.parse_args(argv)
+
+    meta = convert(args.model, args.encoder, args.label_encoder, args.output)
+    print(f"Wrote {args.output}: {meta['n_trees']} trees, {meta['n_nodes']} nodes, "
+          f"{meta['n_features']} features")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Order-invariant multi-hot featurization and its training/comparison path.
+
+The notebook one-hot encodes symptoms1..symptoms5 as five positional
+columns, so "Fever" in slot 1 and "Fever" in slot 3 are different features.
+`MultiHotEncoder` instead encodes a case as a one-hot animal plus one
+multi-hot vector over the symptom vocabulary, so a symptom is a single
+feature wherever it was entered. Terms are normalized (whitespace collapsed,
+lower-cased) so casing variants in data.csv share a column.
+
+Usage:
+    python multihot.py train      # writes the multi-hot model + encoder
+    python multihot.py report     # compares against the positional scheme
+"""
+import argparse
+import io
+import json
+import pickle
+import time
+
+import numpy as np
+from joblib import dump
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+from artifacts import CAT_COLS, TARGET_COL, DATA_PATH, load_dataset
+
+MULTIHOT_MODEL_PATH = 'random_forest_multihot.joblib'
+MULTIHOT_ENCODER_PATH = 'multihot_encoder.pkl'
+REPORT_PATH = 'multihot_report.json'
+
+
+def normalize_term(value):
+    """Collapse whitespace and lower-case; empty/missing values become ''."""
+    if not isinstance(value, str):
+        return ''
+    return ' '.join(value.split()).lower()
+
+
+class MultiHotEncoder:
+    """One-hot animal + multi-hot symptom bag. Unknown terms are ignored."""
+
+    def fit(self, rows):
+        animals, symptoms = set(), set()
+        for row in rows:
+            animals.add(normalize_term(row[0]))
+            symptoms.update(normalize_term(s) for s in row[1:])
+        animals.discard('')
+        symptoms.discard('')
+        return self._set_vocabulary(sorted(animals), sorted(symptoms))
+
+    @classmethod
+    def from_vocabulary(cls, vocabulary):
+        return cls()._set_vocabulary(list(vocabulary['animals']), list(vocabulary['symptoms']))
+
+    def to_vocabulary(self):
+        return {'animals': list(self.animals_), 'symptoms': list(self.symptoms_)}
+
+    def _set_vocabulary(self, animals, symptoms):
+        self.animals_ = animals
+        self.symptoms_ = symptoms
+        self.animal_index_ = {a: i for i, a in enumerate(self.animals_)}
+        offset = len(self.animals_)
+        self.symptom_index_ = {s: offset + i for i, s in enumerate(self.symptoms_)}
+        self.n_features_ = offset + len(self.symptoms_)
+        return self
+
+    def active_indices(self, animal, symptoms):
+        indices = set()
+        idx = self.animal_index_.get(normalize_term(animal))
+        if idx is not None:
+            indices.add(idx)
+        for s in symptoms:
+            idx = self.symptom_index_.get(normalize_term(s))
+            if idx is not None:
+                indices.add(idx)
+        return sorted(indices)
+
+    def transform_one(self, animal, symptoms):
+        row = np.zeros((1, self.n_features_), dtype=np.float64)
+        row[0, self.active_indices(animal, symptoms)] = 1.0
+        return row
+
+    def transform(self, rows):
+        """Dense float64 matrix for rows of [animal, s1, ..., s5]."""
+        rows = list(rows)
+        out = np.zeros((len(rows), self.n_features_), dtype=np.float64)
+        for i, row in enumerate(rows):
+            out[i, self.active_indices(row[0], row[1:])] = 1.0
+        return out
+
+    def fit_transform(self, rows):
+        rows = list(rows)
+        return self.fit(rows).transform(rows)
+
+    def get_feature_names_out(self):
+        return np.array(
+            [f'AnimalName_{a}' for a in self.animals_] + [f'symptom_{s}' for s in self.symptoms_],
+            dtype=object,
+        )
+
+
+def save_encoder(encoder, path=MULTIHOT_ENCODER_PATH):
+    # Only the vocabulary is pickled, so loading never depends on how this
+    # module was imported (e.g. run as __main__)
+    with open(path, 'wb') as f:
+        pickle.dump(encoder.to_vocabulary(), f)
+
+
+def load_encoder(path=MULTIHOT_ENCODER_PATH):
+    with open(path, 'rb') as f:
+        return MultiHotEncoder.from_vocabulary(pickle.load(f))
+
+
+def _split(X, y):
+    # Same split as the notebook
+    return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+
+def _fit_forest(X_train, y_train, n_jobs=None):
+    model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    return model, time.perf_counter() - start
+
+
+def _model_bytes(model):
+    buf = io.BytesIO()
+    dump(model, buf)
+    return buf.getbuffer().nbytes
+
+
+def _single_row_latency_ms(encode_one, model, rows, repeats=200):
+    """Median encode + predict_proba time for one case, in milliseconds."""
+    timings = []
+    for i in range(repeats):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        model.predict_proba(encode_one(row))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def train(data_path=DATA_PATH, model_path=MULTIHOT_MODEL_PATH, encoder_path=MULTIHOT_ENCODER_PATH):
+    """Fit the multi-hot encoder and forest and write both artifacts."""
+    data = load_dataset(data_path)
+    y = LabelEncoder().fit_transform(data[TARGET_COL])
+    encoder = MultiHotEncoder()
+    X = encoder.fit_transform(data[CAT_COLS].to_numpy())
+    X_train, X_test, y_train, y_test = _split(X, y)
+    model, _ = _fit_forest(X_train, y_train)
+    dump(model, model_path)
+    save_encoder(encoder, encoder_path)
+    return accuracy_score(y_test, model.predict(X_test))
+
+
+def compare(data_path=DATA_PATH, repeats=200):
+    """Positional one-hot vs multi-hot on the same data, split and forest settings."""
+    data = load_dataset(data_path)
+    y = LabelEncoder().fit_transform(data[TARGET_COL])
+    rows = data[CAT_COLS].to_numpy()
+
+    positional = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    positional.fit(data[CAT_COLS])
+    multihot = MultiHotEncoder().fit(rows)
+
+    schemes = {
+        'positional': (
+            lambda r: positional.transform(r.reshape(1, -1)),
+            positional.transform,
+        ),
+        'multihot': (
+            lambda r: multihot.transform_one(r[0], r[1:]),
+            multihot.transform,
+        ),
+    }
+    idx_train, idx_test, _, _ = _split(np.arange(len(rows)), y)
+    report = {'rows': int(len(rows)), 'test_rows': int(len(idx_test))}
+    for name, (encode_one, encode_many) in schemes.items():
+        X = encode_many(rows)
+        model, train_seconds = _fit_forest(X[idx_train], y[idx_train])
+        start = time.perf_counter()
+        y_pred = model.predict(X[idx_test])
+        batch_seconds = time.perf_counter() - start
+        report[name] = {
+            'n_features': int(X.shape[1]),
+            'model_bytes': _model_bytes(model),
+            'total_nodes': int(sum(e.tree_.node_count for e in model.estimators_)),
+            'train_seconds': round(train_seconds, 4),
+            'single_row_latency_ms': round(_single_row_latency_ms(encode_one, model, rows[idx_test], repeats), 4),
+            'batch_predict_seconds': round(batch_seconds, 4),
+            'accuracy': round(float(accuracy_score(y[idx_test], y_pred)), 4),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-hot symptom featurization.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_train = sub.add_parser('train', help="Train and save the multi-hot model")
+    p_train.add_argument('--data', default=DATA_PATH)
+    p_train.add_argument('--model', default=MULTIHOT_MODEL_PATH)
+    p_train.add_argument('--encoder', default=MULTIHOT_ENCODER_PATH)
+    p_report = sub.add_parser('report', help="Compare positional and multi-hot schemes")
+    p_report.add_argument('--data', default=DATA_PATH)
+    p_report.add_argument('--output', default=REPORT_PATH)
+    p_report.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if args.command == 'train':
+        accuracy = train(args.data, args.model, args.encoder)
+        print(f"Saved {args.model} and {args.encoder} (held-out accuracy {accuracy:.4f})")
+    else:
+        report = compare(args.data, args.repeats)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
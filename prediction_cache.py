@@ -0,0 +1,118 @@
+"""LRU cache of predictions keyed on the normalized case.
+
+The app's input space is one animal plus up to five symptoms picked from a
+fixed vocabulary, and the same cases come up again and again. Caching the
+(label, probabilities) result for a case skips encoding and the forest
+entirely on a repeat lookup.
+
+The cache watches the artifact files it is given and clears itself when any
+of them is replaced, so a retrained model never serves stale results.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+
+def positional_key(animal, symptoms):
+    """Key for the positional one-hot model: symptom order matters.
+
+    Empty slots (None or '') are treated the same, matching the encoder,
+    which ignores the '' placeholder.
+    """
+    return (animal, tuple(s or '' for s in symptoms))
+
+
+def multiset_key(animal, symptoms):
+    """Order-insensitive key, for featurizers that ignore symptom position."""
+    return (animal, tuple(sorted(s for s in symptoms if s)))
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class PredictionCache:
+    """Thread-safe LRU mapping of case key -> cached prediction."""
+
+    def __init__(self, maxsize=4096, watch=(), key_func=positional_key):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.key_func = key_func
+        self._watch = tuple(watch)
+        self._signature = self._current_signature()
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _current_signature(self):
+        return tuple(_file_signature(p) for p in self._watch)
+
+    def _check_artifacts(self):
+        signature = self._current_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self._data.clear()
+            self.invalidations += 1
+
+    def _key(self, animal, symptoms, version):
+        # The model version is part of the key, so a result computed by one
+        # version is never served for another, even if stored after a swap
+        return (version, self.key_func(animal, symptoms))
+
+    def get(self, animal, symptoms, version=None):
+        """Cached value for the case under model `version`, or None."""
+        key = self._key(animal, symptoms, version)
+        with self._lock:
+            self._check_artifacts()
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, animal, symptoms, value, version=None):
+        key = self._key(animal, symptoms, version)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, animal, symptoms, compute, version=None):
+        """Return the cached value, calling `compute()` and storing it on a miss."""
+        value = self.get(animal, symptoms, version)
+        if value is None:
+            value = compute()
+            self.put(animal, symptoms, value, version)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,314 @@
+"""Versioned model registry with background hot-swap and rollback.
+
+train.py and incremental.py write artifact sets to `models/<version>/`, each
+with a vocabulary.json manifest holding the SHA-256 of the model and encoder
+files. `ModelRegistry` serves one loaded set (`current`) and a daemon thread
+polls the directory for a newer version. A candidate is loaded off the
+request path and only swapped in after:
+
+* every artifact file matches the checksum in its manifest, and
+* a smoke prediction returns finite probabilities that sum to 1.
+
+The swap is a single reference assignment, so a request that took
+`registry.current` keeps using one consistent model + encoder pair while the
+next request sees the new one; nothing ever waits on a load. The previous
+set stays in memory for an instant `rollback()`, and a rolled-back or
+invalid version is never retried. `models/PINNED` (see `pin`) makes every
+watching process serve that version instead of the newest one; a rollback
+pins the version it returns to. Versions are ordered by the `created_utc`
+of their manifests, not by name.
+
+Usage:
+    python registry.py list
+    python registry.py pin 20261017-014951     # serve this version everywhere
+    python registry.py unpin
+    python registry.py rollback                # pin the version before the served one
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from artifacts import CAT_COLS, MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH
+from fast_encoder import FastEncoder
+from forest_engine import CompiledForest
+from manifest import MANIFEST_PATH, load_manifest, stale_artifacts
+from metrics import REGISTRY as metrics
+
+logger = logging.getLogger('animal_health.registry')
+
+REGISTRY_DIR = 'models'
+PIN_FILE = 'PINNED'
+SHIPPED_VERSION = 'shipped'
+
+
+class ModelBundle:
+    """One loaded artifact set; never mutated after construction."""
+
+    def __init__(self, version, engine, encoder, label_classes=None, path=None):
+        self.version = version
+        self.engine = engine
+        self.encoder = encoder
+        self.label_classes = label_classes
+        self.path = path
+        self.loaded_at = time.time()
+
+
+def load_bundle(path, version=None):
+    """Load and validate the artifact set in `path`; raises ValueError if invalid."""
+    from artifacts import load_model, load_encoder, load_label_encoder
+
+    manifest = load_manifest(os.path.join(path, MANIFEST_PATH))
+    stale = stale_artifacts(manifest, path)
+    missing = {MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH} - set(manifest['artifacts'])
+    if stale or missing:
+        raise ValueError(f"checksum mismatch or missing file: {', '.join(sorted(set(stale) | missing))}")
+    bundle = ModelBundle(
+        version or os.path.basename(os.path.normpath(path)),
+        CompiledForest.from_sklearn(load_model(os.path.join(path, MODEL_PATH))),
+        FastEncoder.from_sklearn(load_encoder(os.path.join(path, ENCODER_PATH))),
+        list(load_label_encoder(os.path.join(path, LABEL_ENCODER_PATH)).classes_),
+        path,
+    )
+    smoke_test(bundle)
+    return bundle
+
+
+def smoke_test(bundle):
+    """Score a case built from the first known category of every column."""
+    row = [cats[0] for cats in bundle.encoder.categories]
+    if len(row) != len(CAT_COLS):
+        raise ValueError(f"encoder has {len(row)} input columns, expected {len(CAT_COLS)}")
+    if int(bundle.engine.feature.max()) >= bundle.encoder.n_features:
+        raise ValueError("model splits on features the encoder does not produce")
+    encoded = bundle.encoder.transform_one(row)
+    _, proba = bundle.engine.predict_with_proba(encoded)
+    if proba.shape != (1, len(bundle.engine.classes_)) or not np.all(np.isfinite(proba)) \
+            or not np.isclose(proba.sum(), 1.0):
+        raise ValueError(f"smoke prediction returned invalid probabilities: {proba}")
+
+
+def _created(entry):
+    # Version names are free-form (train.py --version), so order by when the
+    # set was written: the manifest's timestamp, then the directory mtime
+    try:
+        created = load_manifest(os.path.join(entry.path, MANIFEST_PATH)).get('created_utc') or ''
+    except (OSError, ValueError):
+        created = ''
+    return created, entry.stat().st_mtime, entry.name
+
+
+def list_versions(root=REGISTRY_DIR):
+    """Complete artifact sets in `root`, oldest first by creation time."""
+    if not os.path.isdir(root):
+        return []
+    entries = [
+        entry for entry in os.scandir(root)
+        if entry.is_dir() and os.path.exists(os.path.join(entry.path, MANIFEST_PATH))
+    ]
+    return [entry.name for entry in sorted(entries, key=_created)]
+
+
+def read_pin(root=REGISTRY_DIR):
+    try:
+        with open(os.path.join(root, PIN_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def pin(version, root=REGISTRY_DIR):
+    """Serve `version` everywhere; SHIPPED_VERSION means each process's fallback."""
+    if version != SHIPPED_VERSION and version not in list_versions(root):
+        raise ValueError(f"Unknown version: {version}")
+    os.makedirs(root, exist_ok=True)
+    tmp = os.path.join(root, PIN_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp, os.path.join(root, PIN_FILE))
+
+
+def unpin(root=REGISTRY_DIR):
+    try:
+        os.remove(os.path.join(root, PIN_FILE))
+    except FileNotFoundError:
+        pass
+
+
+class ModelRegistry:
+    """Serves the newest valid (or pinned) version of `root`, swapping in the background.
+
+    `fallback` is a ModelBundle served until a registry version is loaded,
+    typically the artifacts the app shipped with.
+    """
+
+    def __init__(self, root=REGISTRY_DIR, fallback=None, interval=5.0):
+        self.root = root
+        self.interval = interval
+        self._fallback = fallback
+        self._current = fallback
+        self._previous = None
+        self._rejected = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def previous(self):
+        return self._previous
+
+    def on_swap(self, callback):
+        """Call `callback(new_bundle, old_bundle)` after every swap."""
+        self._listeners.append(callback)
+
+    def _target(self):
+        pinned = read_pin(self.root)
+        if pinned is not None:
+            return pinned if pinned not in self._rejected else None
+        candidates = [v for v in list_versions(self.root) if v not in self._rejected]
+        return candidates[-1] if candidates else None
+
+    def poll(self):
+        """Load and swap in the target version if it is new; returns True on a swap."""
+        target = self._target()
+        current = self._current
+        if target is None or (current is not None and current.version == target):
+            return False
+        if target == SHIPPED_VERSION:
+            if self._fallback is None:
+                return False
+            self._swap(self._fallback)
+            logger.info("Serving the shipped model (pinned)")
+            return True
+        try:
+            start = time.perf_counter()
+            bundle = load_bundle(os.path.join(self.root, target), target)
+            metrics.observe('model_load', time.perf_counter() - start)
+        except Exception as exc:
+            # A half-written set shows up without its manifest, so anything
+            # failing here is genuinely broken: don't retry it
+            self._rejected.add(target)
+            metrics.inc('model_reloads_total', outcome='rejected')
+            logger.warning("Rejected model version %s: %s", target, exc)
+            return False
+        self._swap(bundle)
+        metrics.inc('model_reloads_total', outcome='loaded')
+        logger.info("Serving model version %s", target)
+        return True
+
+    def _swap(self, bundle, keep_previous=True):
+        with self._lock:
+            old = self._current
+            # A rolled-back bundle is not kept as the next rollback target
+            self._previous = old if keep_previous else None
+            self._current = bundle
+        for callback in self._listeners:
+            callback(bundle, old)
+
+    def rollback(self):
+        """Serve the previous version again and never reload the current one.
+
+        The version rolled back to is pinned, so neither this process nor any
+        other watching `root` moves off it until an operator unpins.
+        """
+        with self._lock:
+            if self._previous is None:
+                raise RuntimeError("No previous model version to roll back to")
+            bad = self._current
+            self._rejected.add(bad.version)
+        self._swap(self._previous, keep_previous=False)
+        pin(self._current.version, self.root)
+        metrics.inc('model_rollbacks_total')
+        logger.warning("Rolled back from %s to %s", bad.version, self._current.version)
+        return self._current
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Model registry poll failed")
+            if self._stop_event.wait(self.interval):
+                return
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='model-registry', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def shipped_bundle(model_path=MODEL_PATH, encoder_path=ENCODER_PATH, label_encoder_path=LABEL_ENCODER_PATH):
+    """ModelBundle for the artifacts at the repository root (no manifest check)."""
+    from artifacts import load_model, load_encoder, load_label_encoder
+    bundle = ModelBundle(
+        SHIPPED_VERSION,
+        CompiledForest.from_sklearn(load_model(model_path)),
+        FastEncoder.from_sklearn(load_encoder(encoder_path)),
+        list(load_label_encoder(label_encoder_path).classes_),
+    )
+    smoke_test(bundle)
+    return bundle
+
+
+def rollback_pin(root=REGISTRY_DIR):
+    """Pin the version before the one being served (the shipped model if none); returns it.
+
+    For operators without access to a running process; every process
+    watching `root` follows the pin.
+    """
+    versions = list_versions(root)
+    served = read_pin(root) or (versions[-1] if versions else None)
+    if served is None or served == SHIPPED_VERSION:
+        raise ValueError("Already serving the shipped model; nothing to roll back")
+    older = versions[:versions.index(served)] if served in versions else []
+    target = older[-1] if older else SHIPPED_VERSION
+    pin(target, root)
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and pin versions of the model registry.")
+    parser.add_argument('--root', default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list')
+    p = sub.add_parser('pin')
+    p.add_argument('version')
+    sub.add_parser('unpin')
+    sub.add_parser('rollback', help="Pin the version before the one being served")
+    args = parser.parse_args(argv)
+
+    if args.command == 'pin':
+        pin(args.version, args.root)
+        print(f"Pinned {args.version}")
+    elif args.command == 'rollback':
+        print(f"Pinned {rollback_pin(args.root)}; unpin to follow new versions again")
+    elif args.command == 'unpin':
+        unpin(args.root)
+        print("Unpinned; the newest valid version will be served")
+    else:
+        pinned = read_pin(args.root)
+        versions = list_versions(args.root)
+        for version in versions:
+            path = os.path.join(args.root, version)
+            stale = stale_artifacts(load_manifest(os.path.join(path, MANIFEST_PATH)), path)
+            marks = [m for m, on in (('pinned', version == pinned), ('checksum mismatch', stale)) if on]
+            print(f"{version}{'  (' + ', '.join(marks) + ')' if marks else ''}")
+        if not versions:
+            print(f"No artifact sets in {args.root}")
+
+
+if __name__ == '__main__':
+    main()
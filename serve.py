@@ -0,0 +1,445 @@
+"""Standalone HTTP JSON inference service with request micro-batching.
+
+Loads the model and encoder once (or follows a model registry, see registry.py),
+then serves:
+
+    POST /predict         {"animal": "Dog", "symptoms": ["Fever", "Diarrhea", "Vomiting"]}
+    POST /predict_batch   {"cases": [{"animal": ..., "symptoms": [...]}, ...]}
+    GET  /stats           latency percentiles, throughput and batching counters
+    GET  /metrics         per-stage histograms and counters, Prometheus text format
+    GET  /drift           input drift report (with --drift-reference, see drift.py)
+    GET  /health
+    POST /rollback        serve (and pin) the previous model version (with --registry)
+
+`symptoms` is positional like the app's five slots (symptoms1..symptoms5):
+use "" for a blank slot, and missing trailing slots are blank.
+Dangerous results include first-aid advice for the case's symptoms.
+Concurrent requests that arrive within a short window are merged by
+`MicroBatcher` into a single encode + predict_proba call.
+
+Usage:
+    python serve.py run --port 8000
+    python serve.py run --registry models      # hot-swap new models/<version> sets
+    python serve.py run --audit-dir audit      # log every prediction (audit.py)
+    python serve.py loadtest --concurrency 16 --requests 2000
+"""
+import argparse
+import json
+import logging
+import queue
+import signal
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from advice import ADVICE_PATH, AdviceIndex
+from artifacts import MODEL_PATH, ENCODER_PATH, load_model, load_encoder
+from audit import feature_hash, make_record, open_audit_log
+from drift import DriftMonitor
+from fast_encoder import FastEncoder
+from forest_engine import CompiledForest
+from metrics import REGISTRY as metrics
+from registry import SHIPPED_VERSION, ModelBundle, ModelRegistry
+
+logger = logging.getLogger('animal_health.serve')
+
+MIN_SYMPTOMS = 3
+MAX_SYMPTOMS = 5
+# Longest a batch waits on a full audit queue before its records are dropped
+AUDIT_PUT_TIMEOUT = 0.1
+
+
+def parse_case(case):
+    """Validate one JSON case and return the encoder row [animal, s1..s5]."""
+    if not isinstance(case, dict):
+        raise ValueError("Each case must be a JSON object")
+    animal = case.get('animal')
+    symptoms = case.get('symptoms') or []
+    if not isinstance(animal, str) or not animal:
+        raise ValueError("'animal' must be a non-empty string")
+    if not isinstance(symptoms, list) or not all(isinstance(s, str) for s in symptoms):
+        raise ValueError("'symptoms' must be a list of strings")
+    if len(symptoms) > MAX_SYMPTOMS:
+        raise ValueError(f"'symptoms' has {MAX_SYMPTOMS} slots, got {len(symptoms)}")
+    if sum(1 for s in symptoms if s) < MIN_SYMPTOMS:
+        raise ValueError(f"Provide between {MIN_SYMPTOMS} and {MAX_SYMPTOMS} symptoms")
+    # The encoder is positional: blanks keep their slot with the app's ''
+    # placeholder, so the API and the app score the same case identically
+    return [animal] + symptoms + [''] * (MAX_SYMPTOMS - len(symptoms))
+
+
+def format_result(label, proba, row=None, advice_index=None):
+    dangerous = bool(label == 1)
+    result = {
+        'label': 'Dangerous' if dangerous else 'Not Dangerous',
+        'dangerous': dangerous,
+        'probability': {'not_dangerous': round(float(proba[0]), 4), 'dangerous': round(float(proba[1]), 4)},
+    }
+    # Same rule as the app: advice is only shown for Dangerous cases
+    if dangerous and advice_index is not None and row is not None:
+        result['advice'] = advice_index.advice_for(row[1:])
+    return result
+
+
+class LatencyStats:
+    """Rolling request latencies plus totals for throughput."""
+
+    def __init__(self, window=10000):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.cases = 0
+        self.batches = 0
+
+    def record_request(self, seconds, cases):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.requests += 1
+            self.cases += cases
+
+    def record_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.array(self._latencies)
+            elapsed = time.perf_counter() - self.started
+            requests, cases, batches = self.requests, self.cases, self.batches
+        summary = {
+            'requests': requests,
+            'cases': cases,
+            'model_batches': batches,
+            'cases_per_batch': round(cases / batches, 2) if batches else 0.0,
+            'uptime_seconds': round(elapsed, 2),
+            'throughput_rps': round(requests / elapsed, 2) if elapsed else 0.0,
+        }
+        if latencies.size:
+            summary['latency_ms'] = {
+                'p50': round(float(np.percentile(latencies, 50)) * 1000, 3),
+                'p99': round(float(np.percentile(latencies, 99)) * 1000, 3),
+                'max': round(float(latencies.max()) * 1000, 3),
+            }
+        return summary
+
+
+class MicroBatcher:
+    """Merges rows submitted within `window_ms` into one model call."""
+
+    def __init__(self, encoder, engine, window_ms=2.0, max_batch=256, stats=None, registry=None,
+                 monitor=None, audit=None):
+        self.encoder = encoder
+        self.engine = engine
+        # With a registry, every batch uses whichever model is live when it starts
+        self.registry = registry
+        self.monitor = monitor
+        self.audit = audit
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.stats = stats
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, rows):
+        """Queue rows for scoring; returns a Future of [(label, proba), ...]."""
+        future = Future()
+        self._queue.put((rows, future))
+        return future
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        n_rows = len(pending[0][0])
+        deadline = time.perf_counter() + self.window
+        while n_rows < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            n_rows += len(item[0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            rows = [row for item_rows, _ in pending for row in item_rows]
+            encoder, engine, version = self.encoder, self.engine, SHIPPED_VERSION
+            if self.registry is not None:
+                bundle = self.registry.current
+                encoder, engine, version = bundle.encoder, bundle.engine, bundle.version
+            start = time.perf_counter()
+            try:
+                with metrics.time('encode'):
+                    encoded = encoder.transform(rows)
+                with metrics.time('predict'):
+                    labels, probas = engine.predict_with_proba(encoded)
+            except Exception as exc:
+                for _, future in pending:
+                    future.set_exception(exc)
+                continue
+            seconds = time.perf_counter() - start
+            if self.stats is not None:
+                self.stats.record_batch()
+            start = 0
+            for item_rows, future in pending:
+                end = start + len(item_rows)
+                future.set_result(list(zip(labels[start:end], probas[start:end])))
+                start = end
+            # After the responses are released, so drift tracking adds no latency
+            if self.monitor is not None:
+                self.monitor.observe_many(rows)
+            if self.audit is not None:
+                # Waits at most AUDIT_PUT_TIMEOUT on a full queue; once a record
+                # is dropped the writer is behind, so the rest of the batch is too
+                for i, (row, label, proba) in enumerate(zip(rows, labels, probas)):
+                    if not self.audit.log(make_record(row, version, label == 1, proba, seconds,
+                                                      feature_hash(encoder, row), source='serve',
+                                                      batch_size=len(rows))):
+                        if len(rows) - i - 1:
+                            metrics.inc('audit_dropped_total', len(rows) - i - 1)
+                        break
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    server_version = 'AnimalHealthPredictor/1.0'
+    # Set on the class by make_server
+    batcher = None
+    stats = None
+    advice_index = None
+    timeout_seconds = 10.0
+
+    def log_message(self, format, *args):
+        # Keep the console quiet under load; /stats has the numbers
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b'null')
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid JSON: {exc.msg}")
+
+    def do_GET(self):
+        if self.path == '/health':
+            registry = self.batcher.registry
+            payload = {'status': 'ok'}
+            if registry is not None:
+                payload['model_version'] = registry.current.version
+            self._send_json(200, payload)
+        elif self.path == '/drift':
+            if self.batcher.monitor is None:
+                self._send_json(404, {'error': "Drift monitoring is off (start with --drift-reference)"})
+            else:
+                self._send_json(200, self.batcher.monitor.report())
+        elif self.path == '/stats':
+            self._send_json(200, self.stats.snapshot())
+        elif self.path == '/metrics':
+            body = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def _rollback(self):
+        registry = self.batcher.registry
+        if registry is None:
+            self._send_json(404, {'error': "No model registry (start with --registry)"})
+            return
+        try:
+            bundle = registry.rollback()
+        except RuntimeError as exc:
+            self._send_json(409, {'error': str(exc)})
+            return
+        self._send_json(200, {'model_version': bundle.version})
+
+    def do_POST(self):
+        if self.path == '/rollback':
+            self._rollback()
+            return
+        start = time.perf_counter()
+        try:
+            payload = self._read_json()
+            if self.path == '/predict':
+                rows = [parse_case(payload)]
+            elif self.path == '/predict_batch':
+                cases = payload.get('cases') if isinstance(payload, dict) else None
+                if not isinstance(cases, list) or not cases:
+                    raise ValueError("'cases' must be a non-empty list")
+                rows = [parse_case(c) for c in cases]
+            else:
+                self._send_json(404, {'error': 'Not found'})
+                return
+        except ValueError as exc:
+            metrics.inc('validation_errors_total')
+            self._send_json(400, {'error': str(exc)})
+            return
+
+        try:
+            scored = self.batcher.submit(rows).result(self.timeout_seconds)
+        except FutureTimeoutError:
+            metrics.inc('request_errors_total', kind='timeout')
+            self._send_json(503, {'error': f"Scoring timed out after {self.timeout_seconds}s"})
+            return
+        except Exception as exc:
+            metrics.inc('request_errors_total', kind='model')
+            logger.exception("Scoring failed")
+            self._send_json(500, {'error': f"Scoring failed: {type(exc).__name__}"})
+            return
+        with metrics.time('format'):
+            results = [format_result(label, proba, row, self.advice_index)
+                       for row, (label, proba) in zip(rows, scored)]
+        n_dangerous = sum(r['dangerous'] for r in results)
+        metrics.record_outcome(True, n_dangerous)
+        metrics.record_outcome(False, len(results) - n_dangerous)
+        if self.path == '/predict':
+            self._send_json(200, results[0])
+        else:
+            self._send_json(200, {'results': results})
+        elapsed = time.perf_counter() - start
+        metrics.observe('request', elapsed)
+        self.stats.record_request(elapsed, len(rows))
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops connections under concurrent load
+    request_queue_size = 128
+
+
+def make_server(host='127.0.0.1', port=8000, model_path=MODEL_PATH, encoder_path=ENCODER_PATH,
+                window_ms=2.0, max_batch=256, advice_path=ADVICE_PATH, registry_dir=None,
+                drift_reference=None, audit_dir=None):
+    stats = LatencyStats()
+    encoder = FastEncoder.from_sklearn(load_encoder(encoder_path))
+    engine = CompiledForest.from_sklearn(load_model(model_path))
+    registry = None
+    if registry_dir is not None:
+        # Start on the given artifacts; newer models/<version> sets swap in live
+        registry = ModelRegistry(registry_dir, fallback=ModelBundle(SHIPPED_VERSION, engine, encoder)).start()
+    monitor = None
+    if drift_reference:
+        # Unknown means unknown to the live model's encoder, which a swap can extend
+        monitor = DriftMonitor.from_file(drift_reference, encoder=registry.current.encoder if registry else encoder)
+        if registry is not None:
+            registry.on_swap(lambda new, old: monitor.use_encoder(new.encoder))
+    audit = open_audit_log(audit_dir, put_timeout=AUDIT_PUT_TIMEOUT) if audit_dir else None
+    batcher = MicroBatcher(encoder, engine, window_ms=window_ms, max_batch=max_batch, stats=stats,
+                           registry=registry, monitor=monitor, audit=audit)
+    handler = type('BoundPredictionHandler', (PredictionHandler,), {
+        'batcher': batcher,
+        'stats': stats,
+        'advice_index': AdviceIndex.from_file(advice_path),
+    })
+    return PredictionServer((host, port), handler)
+
+
+def _post(url, payload):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+def load_test(base_url, cases, concurrency=16, requests=2000):
+    """Fire `requests` single predictions from `concurrency` threads."""
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        _post(base_url + '/predict', cases[i % len(cases)])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies)
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'throughput_rps': round(requests / elapsed, 1),
+        'latency_ms': {
+            'p50': round(float(np.percentile(latencies, 50)) * 1000, 3),
+            'p99': round(float(np.percentile(latencies, 99)) * 1000, 3),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP inference server for the danger predictor.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('run', 'loadtest'):
+        p = sub.add_parser(name)
+        p.add_argument('--host', default='127.0.0.1')
+        p.add_argument('--port', type=int, default=8000 if name == 'run' else 0)
+        p.add_argument('--model', default=MODEL_PATH)
+        p.add_argument('--encoder', default=ENCODER_PATH)
+        p.add_argument('--window-ms', type=float, default=2.0)
+        p.add_argument('--max-batch', type=int, default=256)
+        p.add_argument('--registry', metavar='DIR', help="Hot-swap newer artifact sets from DIR (e.g. models)")
+        p.add_argument('--drift-reference', metavar='PATH',
+                       help="Monitor input drift against this reference (drift_reference.json)")
+        p.add_argument('--audit-dir', metavar='DIR', help="Record every prediction in DIR (see audit.py)")
+        if name == 'loadtest':
+            p.add_argument('--data', default='data.csv')
+            p.add_argument('--concurrency', type=int, default=16)
+            p.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.model, args.encoder, args.window_ms, args.max_batch,
+                         registry_dir=args.registry, drift_reference=args.drift_reference,
+                         audit_dir=args.audit_dir)
+    host, port = server.server_address[:2]
+    if args.command == 'run':
+        # Exit normally on SIGTERM too, so atexit drains the audit log
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        print(f"Serving on http://{host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    # Load test against an in-process server on an ephemeral port
+    import pandas as pd
+    from artifacts import CAT_COLS
+
+    df = pd.read_csv(args.data, dtype=str, keep_default_na=False)
+    cases = [{'animal': r[0], 'symptoms': list(r[1:])} for r in df[CAT_COLS].itertuples(index=False)]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        result = load_test(f'http://{host}:{port}', cases, args.concurrency, args.requests)
+        result['server'] = server.RequestHandlerClass.stats.snapshot()
+        print(json.dumps(result, indent=2))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Similar historical cases via an inverted (animal, symptom) index.
+
+`CaseIndex` groups the archive (data.csv by default) into distinct cases,
+an animal plus a symptom set, each with how often it was recorded as
+dangerous and as not dangerous. An inverted index maps every
+(animal, symptom) pair to the distinct cases containing it, stored as the
+sorted keys that occur plus a CSR-style pair of arrays (`indptr`,
+`postings`); a key is found with a binary search.
+
+A query only visits the postings of its own animal and symptoms: counting
+how often each case id occurs gives the symptom overlap, and the Jaccard
+similarity |A & B| / |A | B| follows from the stored set sizes without
+touching any other case. The top k come from a partial sort, so a lookup
+costs milliseconds whatever the archive size. Names are compared after
+`artifacts.normalize` (whitespace collapsed, lower-cased) and rows are read
+as recorded, without the training forward-fill.
+
+The index is rebuilt from the archive when `similar_cases.npz` is missing or
+was built from a different version of the archive.
+
+Usage:
+    python similar_cases.py build                           # data.csv -> similar_cases.npz
+    python similar_cases.py query Dog Fever Diarrhea Vomiting --top 5
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from artifacts import DATA_PATH, file_sha256, normalize
+
+INDEX_PATH = 'similar_cases.npz'
+DEFAULT_TOP = 5
+
+
+class CaseIndex:
+    """Distinct archive cases and the (animal, symptom) -> case postings."""
+
+    def __init__(self, animals, symptoms, case_animal, case_indptr, case_symptoms, dangerous, safe,
+                 source=None):
+        self.animals = list(animals)
+        self.symptoms = list(symptoms)
+        self.case_animal = np.asarray(case_animal, dtype=np.int32)
+        self.case_indptr = np.asarray(case_indptr, dtype=np.int64)
+        self.case_symptoms = np.asarray(case_symptoms, dtype=np.int32)
+        self.dangerous = np.asarray(dangerous, dtype=np.int32)
+        self.safe = np.asarray(safe, dtype=np.int32)
+        self.source = source or {}
+        self.case_size = np.diff(self.case_indptr).astype(np.int32)
+        self._animal_ids = {normalize(a): i for i, a in enumerate(self.animals)}
+        self._symptom_ids = {normalize(s): i for i, s in enumerate(self.symptoms)}
+        self._build_postings()
+
+    def _build_postings(self):
+        # Key of a pair is animal * n_symptoms + symptom; a stable sort of the
+        # (key, case) pairs by key leaves every posting list sorted by case id.
+        # Only keys that occur are stored, so memory follows the archive, not
+        # the animal x symptom product
+        n_symptoms = len(self.symptoms)
+        cases = np.repeat(np.arange(len(self.case_animal), dtype=np.int32), self.case_size)
+        keys = self.case_animal[cases].astype(np.int64) * n_symptoms + self.case_symptoms
+        order = np.argsort(keys, kind='stable')
+        self.postings = cases[order]
+        self.keys, starts = np.unique(keys[order], return_index=True)
+        self.indptr = np.append(starts, len(keys)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.case_animal)
+
+    @classmethod
+    def from_rows(cls, rows, source=None):
+        """Build from an iterable of chunks of [animal, s1..s5, label] string rows."""
+        animals, symptoms = {}, {}            # normalized name -> (id, Counter of spellings)
+        cases = {}
+
+        def name_id(names, raw):
+            entry = names.setdefault(normalize(raw), (len(names), Counter()))
+            entry[1][' '.join(raw.split())] += 1
+            return entry[0]
+
+        for chunk in rows:
+            for row in chunk:
+                animal, label = normalize(row[0]), normalize(row[-1])
+                if not animal or label not in ('yes', 'no'):
+                    continue
+                a = name_id(animals, row[0])
+                ids = {name_id(symptoms, raw) for raw in row[1:-1] if normalize(raw)}
+                if not ids:
+                    continue
+                counts = cases.setdefault((a, tuple(sorted(ids))), [0, 0])
+                counts[label == 'yes'] += 1
+
+        case_animal = np.fromiter((a for a, _ in cases), dtype=np.int32, count=len(cases))
+        sizes = np.fromiter((len(s) for _, s in cases), dtype=np.int64, count=len(cases))
+        case_symptoms = np.fromiter((i for _, s in cases for i in s), dtype=np.int32, count=int(sizes.sum()))
+        counts = np.array(list(cases.values()), dtype=np.int32).reshape(-1, 2)
+        # The most common spelling is the one displayed
+        return cls(
+            [spellings.most_common(1)[0][0] for _, spellings in animals.values()],
+            [spellings.most_common(1)[0][0] for _, spellings in symptoms.values()],
+            case_animal, np.concatenate([[0], np.cumsum(sizes)]), case_symptoms,
+            counts[:, 1], counts[:, 0], source,
+        )
+
+    @classmethod
+    def from_csv(cls, path=DATA_PATH):
+        # clean_data pulls in pandas, which the app only needs when rebuilding
+        from clean_data import iter_chunks
+        return cls.from_rows(iter_chunks(path), {'path': path, 'sha256': file_sha256(path)})
+
+    def save(self, path=INDEX_PATH):
+        # Postings are rebuilt on load (one sort), so only the cases are stored
+        np.savez_compressed(
+            path,
+            animals=np.array(self.animals, dtype=str),
+            symptoms=np.array(self.symptoms, dtype=str),
+            case_animal=self.case_animal,
+            case_indptr=self.case_indptr,
+            case_symptoms=self.case_symptoms,
+            dangerous=self.dangerous,
+            safe=self.safe,
+            source=np.array(json.dumps(self.source)),
+        )
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path) as f:
+            return cls(
+                f['animals'].tolist(), f['symptoms'].tolist(), f['case_animal'], f['case_indptr'],
+                f['case_symptoms'], f['dangerous'], f['safe'], json.loads(str(f['source'])),
+            )
+
+    def query(self, animal, symptoms, top=DEFAULT_TOP):
+        """The `top` cases of `animal` most similar to `symptoms` by Jaccard similarity.
+
+        Returns dicts with the case's symptoms, the similarity, the shared
+        symptoms and how often the case was recorded as dangerous / not
+        dangerous, most similar (then most often recorded) first.
+        """
+        a = self._animal_ids.get(normalize(animal or ''))
+        wanted = {normalize(s) for s in symptoms if s}
+        wanted.discard('')
+        ids = sorted({self._symptom_ids[s] for s in wanted if s in self._symptom_ids})
+        if a is None or not ids or not len(self.keys):
+            return []
+        keys = a * len(self.symptoms) + np.array(ids, dtype=np.int64)
+        slots = np.searchsorted(self.keys, keys)
+        slots = slots[(slots < len(self.keys)) & (self.keys[np.minimum(slots, len(self.keys) - 1)] == keys)]
+        if not len(slots):
+            return []
+        hits = np.concatenate([self.postings[self.indptr[k]:self.indptr[k + 1]] for k in slots])
+        candidates, overlap = np.unique(hits, return_counts=True)
+        # Unknown query symptoms still count towards the union
+        jaccard = overlap / (len(wanted) + self.case_size[candidates] - overlap)
+        seen = self.dangerous[candidates] + self.safe[candidates]
+        if len(candidates) > top:
+            # Everything tied with the k-th score is kept, then ordered exactly
+            cut = np.partition(-jaccard, top - 1)[top - 1]
+            keep = np.flatnonzero(-jaccard <= cut)
+            candidates, overlap, jaccard, seen = candidates[keep], overlap[keep], jaccard[keep], seen[keep]
+        order = np.lexsort((candidates, -seen, -jaccard))[:top]
+
+        query_ids = set(ids)
+        results = []
+        for i in order:
+            case = int(candidates[i])
+            case_ids = self.case_symptoms[self.case_indptr[case]:self.case_indptr[case + 1]]
+            results.append({
+                'animal': self.animals[a],
+                'symptoms': [self.symptoms[s] for s in case_ids],
+                'shared': [self.symptoms[s] for s in case_ids if s in query_ids],
+                'similarity': round(float(jaccard[i]), 4),
+                'dangerous': int(self.dangerous[case]),
+                'not_dangerous': int(self.safe[case]),
+            })
+        return results
+
+
+def load_index(path=INDEX_PATH, data_path=DATA_PATH):
+    """The saved index if it was built from the current `data_path`, else a fresh one."""
+    if os.path.exists(path):
+        index = CaseIndex.load(path)
+        if not os.path.exists(data_path) or index.source.get('sha256') == file_sha256(data_path):
+            return index
+    return CaseIndex.from_csv(data_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the similar-cases index.")
+    parser.add_argument('--data', default=DATA_PATH, help="Case archive (e.g. data.csv or cleaned_data.csv)")
+    parser.add_argument('--index', default=INDEX_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build')
+    q = sub.add_parser('query')
+    q.add_argument('animal')
+    q.add_argument('symptoms', nargs='+')
+    q.add_argument('--top', type=int, default=DEFAULT_TOP)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        index = CaseIndex.from_csv(args.data)
+        index.save(args.index)
+        print(f"Indexed {len(index)} distinct cases ({len(index.animals)} animals, "
+              f"{len(index.symptoms)} symptoms, {len(index.postings)} postings) "
+              f"in {time.perf_counter() - start:.2f}s -> {args.index}")
+        return
+
+    index = load_index(args.index, args.data)
+    start = time.perf_counter()
+    results = index.query(args.animal, args.symptoms, args.top)
+    elapsed = time.perf_counter() - start
+    for r in results:
+        print(f"{r['similarity']:.2f}  {r['animal']}: {', '.join(r['symptoms'])}  "
+              f"(dangerous {r['dangerous']}, not dangerous {r['not_dangerous']})")
+    print(f"{len(results)} cases in {elapsed * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Parity of the compiled forest with the shipped sklearn model."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from artifacts import CAT_COLS, load_encoder, load_model
+from fast_encoder import FastEncoder
+from forest_engine import CompiledForest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def model():
+    return load_model(os.path.join(ROOT, 'random_forest_model.joblib'))
+
+
+@pytest.fixture(scope='module')
+def encoder():
+    return load_encoder(os.path.join(ROOT, 'onehot_encoder.pkl'))
+
+
+@pytest.fixture(scope='module')
+def engine(model):
+    return CompiledForest.from_sklearn(model)
+
+
+@pytest.fixture(scope='module')
+def cases():
+    df = pd.read_csv(os.path.join(ROOT, 'data.csv'), dtype=str, keep_default_na=False)
+    return df[CAT_COLS]
+
+
+def assert_parity(engine, model, X):
+    labels, proba = engine.predict_with_proba(X)
+    np.testing.assert_array_equal(proba, model.predict_proba(X))
+    np.testing.assert_array_equal(labels, model.predict(X))
+
+
+def test_matches_sklearn_on_data_csv(engine, model, encoder, cases):
+    assert_parity(engine, model, encoder.transform(cases))
+
+
+def test_matches_sklearn_on_unseen_categories(engine, model, encoder, cases):
+    # Unknown animals and symptoms and empty slots encode as all-zero columns
+    unseen = cases.head(200).copy()
+    unseen.iloc[::2, 0] = 'Axolotl'
+    unseen.iloc[::3, 1] = 'Glowing ears'
+    unseen.iloc[1::3, 4] = ''
+    unseen.iloc[2::5, 1:] = 'Not a symptom'
+    unseen.iloc[::7, :] = ''
+    X = encoder.transform(unseen)
+    assert (X.sum(axis=1) < len(CAT_COLS)).any()
+    assert_parity(engine, model, X)
+
+
+def test_matches_fast_encoder_rows(engine, model, encoder, cases):
+    fast = FastEncoder.from_sklearn(encoder)
+    rows = cases.head(500).to_numpy().tolist() + [['Axolotl', 'Glowing ears', '', '', '', '']]
+    X = fast.transform(rows)
+    np.testing.assert_array_equal(X, encoder.transform(pd.DataFrame(rows, columns=CAT_COLS)))
+    assert_parity(engine, model, X)
+
+
+def test_negative_inputs_use_traversal(engine, model, encoder, cases):
+    # Outside the one-hot domain the engine walks the trees instead
+    X = encoder.transform(cases.head(300)) - 0.5
+    assert_parity(engine, model, X)
+
+
+def test_empty_batch(engine, model):
+    labels, proba = engine.predict_with_proba(np.zeros((0, model.n_features_in_)))
+    assert len(labels) == 0 and proba.shape == (0, len(model.classes_))
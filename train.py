@@ -0,0 +1,234 @@
+"""Command-line training pipeline extracted from animalpredictionjup.ipynb.
+
+Reproduces the notebook steps (ffill, LabelEncoder, OneHotEncoder, stratified
+80/20 split, RandomForestClassifier with random_state=42) but fits the forest
+on all cores. `--search` runs a hyperparameter grid (tree count, depth,
+min_samples_leaf) in a process pool; the dataset is encoded once and handed
+to each worker at start-up instead of being re-encoded per trial.
+
+Artifacts are written to a versioned directory:
+
+    models/<version>/random_forest_model.joblib
+    models/<version>/onehot_encoder.pkl
+    models/<version>/label_encoder.pkl
+    models/<version>/metrics.json
+    models/<version>/vocabulary.json
+
+Usage:
+    python train.py
+    python train.py --search --workers 4 --version 2026-10-rc1
+    python train.py --publish      # also copy the artifacts over the ones the app loads
+    python train.py --data data.cols   # train from the columnar format (columnar.py)
+"""
+import argparse
+import itertools
+import json
+import os
+import pickle
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import sklearn
+from joblib import dump
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+
+from artifacts import (
+    CAT_COLS, TARGET_COL, DATA_PATH, MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH,
+    file_sha256, load_dataset,
+)
+import mmap_artifacts
+from columnar import ColumnarDataset, is_columnar
+from manifest import MANIFEST_PATH, build_manifest, write_manifest
+
+MODELS_DIR = 'models'
+METRICS_FILE = 'metrics.json'
+RANDOM_STATE = 42
+
+DEFAULT_PARAMS = {'n_estimators': 100, 'max_depth': None, 'min_samples_leaf': 1}
+SEARCH_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [None, 20, 40],
+    'min_samples_leaf': [1, 2, 4],
+}
+
+
+def encode_dataset(data):
+    """Notebook steps 5-9: fit the label and one-hot encoders and encode."""
+    label_encoder = LabelEncoder()
+    y = label_encoder.fit_transform(data[TARGET_COL])
+    encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    X = encoder.fit_transform(data[CAT_COLS])
+    return X, y, encoder, label_encoder
+
+
+def split(X, y):
+    return train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y)
+
+
+def build_forest(params, n_jobs=-1):
+    return RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=n_jobs, **params)
+
+
+# ----- Hyperparameter search -----
+# Workers receive the encoded training matrix once, via the pool initializer
+_worker_data = {}
+
+
+def _init_worker(X, y, cv_folds):
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+    _worker_data['cv'] = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=RANDOM_STATE)
+
+
+def _evaluate(params):
+    # One core per trial; the pool provides the parallelism
+    model = build_forest(params, n_jobs=1)
+    scores = cross_val_score(model, _worker_data['X'], _worker_data['y'], cv=_worker_data['cv'])
+    return params, float(scores.mean()), float(scores.std())
+
+
+def grid(search_grid=SEARCH_GRID):
+    keys = list(search_grid)
+    for values in itertools.product(*(search_grid[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def search(X_train, y_train, workers=None, cv_folds=3, search_grid=SEARCH_GRID):
+    """Cross-validated grid search in a process pool; returns results best-first."""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(X_train, y_train, cv_folds)) as pool:
+        results = list(pool.map(_evaluate, grid(search_grid)))
+    results.sort(key=lambda r: (-r[1], r[0]['n_estimators']))
+    return [{'params': p, 'cv_accuracy': round(m, 4), 'cv_std': round(s, 4)} for p, m, s in results]
+
+
+# ----- Pipeline -----
+def train(data_path=DATA_PATH, output_dir=MODELS_DIR, version=None, params=None,
+          run_search=False, workers=None, cv_folds=3):
+    """Train, evaluate and write a versioned artifact set; returns its directory."""
+    version = version or new_version()
+    target = os.path.join(output_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"Artifact version already exists: {target}")
+
+    if is_columnar(data_path):
+        # Sparse one-hot built from the stored codes; no CSV parsing
+        dataset = ColumnarDataset(data_path)
+        X, y, _ = dataset.training_set()
+        encoder, label_encoder = dataset.encoders()
+        data_info = {'path': data_path, 'sha256': dataset.meta['source']['sha256'], 'rows': int(len(y))}
+    else:
+        data = load_dataset(data_path)
+        X, y, encoder, label_encoder = encode_dataset(data)
+        data_info = {'path': data_path, 'sha256': file_sha256(data_path), 'rows': int(len(data))}
+    X_train, X_test, y_train, y_test = split(X, y)
+
+    search_results = None
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    if run_search:
+        search_results = search(X_train, y_train, workers=workers, cv_folds=cv_folds)
+        params = search_results[0]['params']
+
+    model = build_forest(params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    # Inference runs single-threaded in the app; don't pickle n_jobs=-1 into it
+    model.set_params(n_jobs=None)
+
+    y_pred = model.predict(X_test)
+    metrics = {
+        'version': version,
+        'created_utc': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'data': data_info,
+        'params': params,
+        'n_features': int(X.shape[1]),
+        'train_seconds': round(train_seconds, 3),
+        'accuracy': round(float(accuracy_score(y_test, y_pred)), 4),
+        'classification_report': classification_report(
+            y_test, y_pred, target_names=list(label_encoder.classes_), output_dict=True),
+        'sklearn_version': sklearn.__version__,
+    }
+    if search_results is not None:
+        metrics['search'] = search_results
+
+    write_artifacts(target, model, encoder, label_encoder, metrics)
+    return target
+
+
+def write_artifacts(target, model, encoder, label_encoder, metrics):
+    """Write one artifact set (model, encoders, metrics, manifest) into `target`."""
+    os.makedirs(target)
+    dump(model, os.path.join(target, MODEL_PATH))
+    with open(os.path.join(target, ENCODER_PATH), 'wb') as f:
+        pickle.dump(encoder, f)
+    with open(os.path.join(target, LABEL_ENCODER_PATH), 'wb') as f:
+        pickle.dump(label_encoder, f)
+    with open(os.path.join(target, METRICS_FILE), 'w') as f:
+        json.dump(metrics, f, indent=2)
+    write_manifest(
+        build_manifest(encoder, [os.path.join(target, n) for n in (MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH)]),
+        os.path.join(target, MANIFEST_PATH),
+    )
+
+
+def new_version():
+    return datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+
+
+def publish(artifact_dir, dest='.'):
+    """Copy a versioned artifact set over the files the app loads."""
+    # Copy then rename, so a process loading the files never reads a partial one
+    for name in (MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH, MANIFEST_PATH):
+        tmp = os.path.join(dest, name + '.tmp')
+        shutil.copyfile(os.path.join(artifact_dir, name), tmp)
+        os.replace(tmp, os.path.join(dest, name))
+    # Keep an existing memory-mapped copy in step with the new files; convert()
+    # writes a new version directory and swaps the symlink, so workers that
+    # have the current one mapped are unaffected
+    mmap_dir = os.path.join(dest, mmap_artifacts.ARTIFACT_DIR)
+    if os.path.isdir(mmap_dir):
+        mmap_artifacts.convert(
+            *(os.path.join(dest, n) for n in (MODEL_PATH, ENCODER_PATH, LABEL_ENCODER_PATH)),
+            output_dir=mmap_dir,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the Random Forest danger classifier.")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV file or columnar dataset directory")
+    parser.add_argument('--output-dir', default=MODELS_DIR)
+    parser.add_argument('--version', help="Artifact version (default: UTC timestamp)")
+    parser.add_argument('--n-estimators', type=int)
+    parser.add_argument('--max-depth', type=int)
+    parser.add_argument('--min-samples-leaf', type=int)
+    parser.add_argument('--search', action='store_true', help="Run the hyperparameter grid search first")
+    parser.add_argument('--workers', type=int, help="Search processes (default: all cores)")
+    parser.add_argument('--cv-folds', type=int, default=3)
+    parser.add_argument('--publish', action='store_true', help="Copy the new artifacts over the app's files")
+    args = parser.parse_args(argv)
+
+    params = {k: v for k, v in {
+        'n_estimators': args.n_estimators,
+        'max_depth': args.max_depth,
+        'min_samples_leaf': args.min_samples_leaf,
+    }.items() if v is not None}
+    target = train(args.data, args.output_dir, args.version, params,
+                   run_search=args.search, workers=args.workers, cv_folds=args.cv_folds)
+    with open(os.path.join(target, METRICS_FILE)) as f:
+        metrics = json.load(f)
+    print(f"Saved artifacts to {target}")
+    print(f"Params: {metrics['params']}  Accuracy: {metrics['accuracy']}  "
+          f"Train time: {metrics['train_seconds']}s")
+    if args.publish:
+        publish(target)
+        print("Published to the app's artifact paths")
+
+
+if __name__ == '__main__':
+    main()